@@ -7,6 +7,7 @@ from typing import Callable
 import uvicorn
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 
 # Import configurations and initializers
@@ -89,6 +90,13 @@ async def lifespan(app: FastAPI):
     except (ImportError, AttributeError) as e:
         logger.warning(f"Could not properly shut down scheduler: {e}")
     
+    # Write out any fetch attempts still queued for the database
+    try:
+        from database import flush_fetch_log
+        flush_fetch_log()
+    except Exception as e:
+        logger.warning(f"Could not flush fetch log: {e}")
+
     # Close HTTP clients
     try:
         # Import the functions to close HTTP clients
@@ -107,7 +115,10 @@ app = FastAPI(
     title="Manfred Job Fetcher API",
     description="API for fetching, storing, and processing job offers from GetManfred, with Discord notifications.",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    docs_url="/docs" if CONFIG['ENABLE_DOCS'] else None,
+    redoc_url="/redoc" if CONFIG['ENABLE_DOCS'] else None,
+    openapi_url="/openapi.json" if CONFIG['ENABLE_DOCS'] else None,
 )
 
 # Add CORS middleware
@@ -126,6 +137,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses for clients sending Accept-Encoding: gzip; small bodies
+# aren't worth the CPU
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # SQLAlchemy session management middleware
 @app.middleware("http")
 async def db_session_middleware(request: Request, call_next: Callable):
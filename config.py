@@ -1,7 +1,7 @@
 # --- START OF FILE config.py ---
 import os
 import logging
-import json
+import orjson
 from typing import Annotated, Any, Dict, List
 
 from pydantic import field_validator
@@ -30,7 +30,11 @@ class Settings(BaseSettings):
     DB_PATH: str = "/app/data/history.db"
     MAX_RETRIES: int = 3
     RETRY_BACKOFF: float = 0.5
+    RETRY_MAX_SLEEP: float = 30.0
+    OFFERS_CACHE_TTL: float = 60.0
+    DETAIL_FETCH_WORKERS: int = 10  # concurrent job detail requests
     DISCORD_WEBHOOK_URL: str = ""
+    DISCORD_EMBEDS_PER_MESSAGE: int = 1  # offers per webhook message (Discord allows up to 10)
     RESET_DB: bool = False
     FETCH_INTERVAL: int = 3600  # seconds; default 1 hour
     SQLALCHEMY_ECHO: bool = False
@@ -41,6 +45,8 @@ class Settings(BaseSettings):
     # Provided as a comma-separated string ("a,b,c"); NoDecode stops pydantic-settings
     # from JSON-decoding it so the validator below can split it.
     CORS_ALLOW_ORIGINS: Annotated[List[str], NoDecode] = ["*"]
+    # Serve /docs, /redoc and /openapi.json; disable in production to skip building the schema
+    ENABLE_DOCS: bool = True
 
     # Relevance filter: "off" disables it, "rules" uses the criteria questionnaire,
     # "ai" uses the Claude-based scorer. FILTER_BEHAVIOR is "hard" (only notify
@@ -111,8 +117,8 @@ def load_config():
     build_id_hash = ""
     try:
         if os.path.exists(config_file):
-            with open(config_file, "r") as f:
-                build_id_hash = json.load(f).get("BUILD_ID_HASH", "")
+            with open(config_file, "rb") as f:
+                build_id_hash = orjson.loads(f.read()).get("BUILD_ID_HASH", "")
                 if build_id_hash:
                     logger.info(f"Loaded BUILD_ID_HASH from file: {build_id_hash}")
                 else:
@@ -128,8 +134,8 @@ def load_config():
             build_id_hash = env_hash
             try:
                 os.makedirs(config_dir, exist_ok=True)
-                with open(config_file, "w") as f:
-                    json.dump({"BUILD_ID_HASH": build_id_hash}, f)
+                with open(config_file, "wb") as f:
+                    f.write(orjson.dumps({"BUILD_ID_HASH": build_id_hash}))
                 logger.info("Saved environment BUILD_ID_HASH to file for future use")
             except Exception as e:
                 logger.warning(f"Failed to save environment BUILD_ID_HASH to file: {e}")
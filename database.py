@@ -2,9 +2,14 @@
 # --- SQLAlchemy Implementation of database.py ---
 import os
 import logging
+import queue
+import threading
+import time
 from datetime import datetime
 
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Text, ForeignKey, DateTime, CheckConstraint, Index
+import orjson
+
+from sqlalchemy import event, func, text, inspect, insert, create_engine, Column, Integer, String, Boolean, Text, ForeignKey, DateTime, CheckConstraint, Index
 from sqlalchemy.orm import sessionmaker, relationship, scoped_session, declarative_base
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -12,6 +17,9 @@ from config import CONFIG
 
 logger = logging.getLogger(__name__)
 
+# Keeps each IN (...) list well under SQLite's bound-parameter limit
+_IN_CLAUSE_CHUNK = 500
+
 # Create the directory for the database if it doesn't exist
 db_path = CONFIG['DB_PATH']
 db_dir = os.path.dirname(db_path)
@@ -24,6 +32,25 @@ if db_dir and not os.path.exists(db_dir):
 
 # Create the SQLAlchemy engine with SQLite connection
 engine = create_engine(f"sqlite:///{db_path}", connect_args={"timeout": 15})
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection.
+
+    WAL lets readers (e.g. the notifier) proceed while fetch_history is being written,
+    and synchronous=NORMAL is safe under WAL while skipping most fsyncs.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-20000")  # ~20MB
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256MB
+    finally:
+        cursor.close()
+
 SessionFactory = sessionmaker(bind=engine)
 Session = scoped_session(SessionFactory)
 
@@ -41,6 +68,11 @@ class FetchHistory(Base):
     response_size = Column(Integer)
     error = Column(Text)
 
+    # Indexes
+    __table_args__ = (
+        Index('idx_fetch_history_timestamp', 'timestamp'),
+    )
+
 
 class JobOffer(Base):
     __tablename__ = 'job_offers'
@@ -94,6 +126,7 @@ class JobSkill(Base):
     __table_args__ = (
         CheckConstraint("category IN ('must', 'nice', 'extra')", name="check_category"),
         Index('idx_job_skills_offer_id', 'offer_id'),
+        Index('idx_job_skills_offer_id_category', 'offer_id', 'category'),
         {'sqlite_autoincrement': True}
     )
 
@@ -124,10 +157,11 @@ def init_db():
         logger.warning(f"RESET_DB is true, deleting existing database: {CONFIG['DB_PATH']}")
         try:
             os.remove(CONFIG['DB_PATH'])
-            # Also remove any journal files that might exist
-            if os.path.exists(f"{CONFIG['DB_PATH']}-journal"):
-                os.remove(f"{CONFIG['DB_PATH']}-journal")
-                logger.info("Removed database journal file")
+            # Also remove any journal/WAL files that might exist
+            for suffix in ("-journal", "-wal", "-shm"):
+                if os.path.exists(f"{CONFIG['DB_PATH']}{suffix}"):
+                    os.remove(f"{CONFIG['DB_PATH']}{suffix}")
+                    logger.info(f"Removed database {suffix[1:]} file")
         except OSError as e:
             logger.error(f"Error removing database file: {e}")
     
@@ -136,6 +170,8 @@ def init_db():
         Base.metadata.create_all(engine)
         # Apply lightweight, idempotent column migrations for pre-existing databases.
         _ensure_relevance_columns()
+        _ensure_indexes()
+        _migrate_locations_to_json()
         logger.info("Database initialized/verified successfully.")
     except Exception as e:
         logger.error(f"Failed to initialize or migrate database: {e}", exc_info=True)
@@ -148,8 +184,6 @@ def _ensure_relevance_columns():
     create_all() never alters existing tables, so a database created before these
     columns existed needs them added explicitly. No-op on fresh databases.
     """
-    from sqlalchemy import text, inspect
-
     existing = {col["name"] for col in inspect(engine).get_columns("job_offers")}
     migrations = {
         "relevance_score": "ALTER TABLE job_offers ADD COLUMN relevance_score INTEGER",
@@ -164,11 +198,42 @@ def _ensure_relevance_columns():
         logger.info(f"Applied {len(pending)} relevance-column migration(s) to job_offers.")
 
 
+def _ensure_indexes():
+    """Create any model-declared index missing from an older database.
+
+    create_all() only creates indexes together with their table, so indexes added to
+    an existing table later are created here. No-op when they all exist.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def _migrate_locations_to_json():
+    """Rewrite legacy ', '-joined locations values as JSON arrays.
+
+    Locations used to be stored joined with ', ', which could not round-trip a
+    location containing a comma. Rows already holding a JSON array are left alone,
+    so this is a no-op once migrated.
+    """
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT id, locations FROM job_offers "
+            "WHERE locations IS NOT NULL AND locations NOT LIKE '[%'"
+        )).all()
+        for row_id, locations in rows:
+            conn.execute(
+                text("UPDATE job_offers SET locations = :locations WHERE id = :id"),
+                {"locations": orjson.dumps(locations.split(', ')).decode(), "id": row_id}
+            )
+    if rows:
+        logger.info(f"Migrated locations of {len(rows)} job offer(s) to JSON arrays.")
+
+
 def check_db_connection():
     """Checks if a connection to the database can be established."""
     try:
         # Use SQLAlchemy text() function for raw SQL expressions
-        from sqlalchemy import text
         session = Session()
         session.execute(text("SELECT 1")).scalar()
         session.close()
@@ -178,28 +243,157 @@ def check_db_connection():
         return False, f"error: {str(e)}"
 
 
-def log_fetch_attempt(endpoint, status_code=None, response_size=None, error=None):
-    """Log API fetch attempts to the database."""
+# Fetch attempts queued by the HTTP client and written by a background thread, so
+# requests don't wait on a SQLite commit each.
+_fetch_log_queue = queue.Queue()
+_fetch_log_worker = None
+_fetch_log_worker_lock = threading.Lock()
+_FETCH_LOG_BATCH_SIZE = 100
+_FETCH_LOG_BATCH_WAIT = 0.5  # seconds to wait for more entries before writing a batch
+_FETCH_HISTORY_MAX_ROWS = 10000  # fetch_history keeps only the newest rows
+_FETCH_HISTORY_PRUNE_EVERY = 1000  # prune after this many background inserts
+
+
+def queue_fetch_attempt(endpoint, status_code=None, response_size=None, error=None):
+    """Queue an API fetch attempt to be logged to the database in the background."""
+    global _fetch_log_worker
+    _fetch_log_queue.put_nowait({
+        "timestamp": datetime.now(),
+        "endpoint": endpoint,
+        "status_code": status_code,
+        "response_size": response_size,
+        "error": str(error) if error else None,
+    })
+    if _fetch_log_worker is None:
+        with _fetch_log_worker_lock:
+            if _fetch_log_worker is None:
+                _fetch_log_worker = threading.Thread(target=_run_fetch_log_worker, name="fetch-log-writer", daemon=True)
+                _fetch_log_worker.start()
+
+
+def flush_fetch_log(timeout=5.0):
+    """
+    Wait up to ``timeout`` seconds for every queued fetch attempt to be written.
+    Returns True if the queue drained, False if entries were still pending (e.g. the
+    writer is stuck on a locked database), so shutdown never hangs on it.
+    """
+    deadline = time.monotonic() + timeout
+    while _fetch_log_queue.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            logger.warning(f"Gave up waiting for {_fetch_log_queue.unfinished_tasks} queued fetch attempt(s) to be written")
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def prune_fetch_history(max_rows=_FETCH_HISTORY_MAX_ROWS):
+    """Delete all but the newest max_rows fetch_history rows. Returns the number deleted."""
     session = Session()
     try:
-        fetch_history = FetchHistory(
-            timestamp=datetime.now(),
-            endpoint=endpoint,
-            status_code=status_code,
-            response_size=response_size,
-            error=str(error) if error else None
-        )
-        session.add(fetch_history)
+        cutoff = session.query(FetchHistory.id)\
+            .order_by(FetchHistory.id.desc())\
+            .offset(max_rows)\
+            .limit(1)\
+            .scalar()
+        if cutoff is None:
+            return 0
+        deleted = session.query(FetchHistory)\
+            .filter(FetchHistory.id <= cutoff)\
+            .delete(synchronize_session=False)
         session.commit()
+        logger.info(f"Pruned {deleted} old fetch_history row(s)")
+        return deleted
     except Exception as e:
-        logger.error(f"Failed to log fetch attempt for {endpoint} due to DB error: {e}")
+        logger.error(f"Failed to prune fetch_history: {e}")
         session.rollback()
+        return 0
     finally:
         session.close()
 
 
+def _run_fetch_log_worker():
+    """Drain the fetch-log queue, inserting up to _FETCH_LOG_BATCH_SIZE rows per transaction."""
+    inserted_since_prune = 0
+    while True:
+        batch = [_fetch_log_queue.get()]
+        try:
+            while len(batch) < _FETCH_LOG_BATCH_SIZE:
+                batch.append(_fetch_log_queue.get(timeout=_FETCH_LOG_BATCH_WAIT))
+        except queue.Empty:
+            pass
+
+        try:
+            session = Session()
+            try:
+                session.bulk_insert_mappings(FetchHistory, batch)
+                session.commit()
+                inserted_since_prune += len(batch)
+            except Exception as e:
+                logger.error(f"Failed to log {len(batch)} fetch attempt(s) due to DB error: {e}")
+                session.rollback()
+            finally:
+                session.close()
+
+            # Keep the table bounded; done here so no request path pays for it
+            if inserted_since_prune >= _FETCH_HISTORY_PRUNE_EVERY:
+                inserted_since_prune = 0
+                prune_fetch_history()
+        except Exception as e:
+            # Never let the writer thread die: queued entries would never be marked done
+            logger.error(f"Fetch-log writer failed on a batch of {len(batch)}: {e}")
+        finally:
+            Session.remove()
+            for _ in batch:
+                _fetch_log_queue.task_done()
+
+
+def _replace_job_skills(session, offer_id, skills_data):
+    """Replaces an offer's skills within ``session`` (no commit); returns how many were added."""
+    # Delete existing skills
+    session.query(JobSkill).filter(JobSkill.offer_id == offer_id).delete()
+
+    # Insert new skills with one executemany instead of an ORM object per row
+    rows = [
+        {
+            'offer_id': offer_id,
+            'category': category,
+            'skill_name': skill.get('skill', ''),
+            'skill_icon': skill.get('icon', ''),
+            'skill_level': skill.get('level', 0),
+            'skill_desc': skill.get('desc', '')
+        }
+        for category in ('must', 'nice', 'extra')
+        for skill in skills_data.get(category) or []
+    ]
+    if rows:
+        session.execute(insert(JobSkill), rows)
+    return len(rows)
+
+
+def _replace_job_languages(session, offer_id, languages_data):
+    """Replaces an offer's languages within ``session`` (no commit); returns how many were added."""
+    # Delete existing languages
+    session.query(JobLanguage).filter(JobLanguage.offer_id == offer_id).delete()
+
+    # Insert new languages with one executemany
+    rows = [
+        {
+            'offer_id': offer_id,
+            'language_name': language.get('name', ''),
+            'language_level': language.get('level', '')
+        }
+        for language in languages_data
+    ]
+    if rows:
+        session.execute(insert(JobLanguage), rows)
+    return len(rows)
+
+
 def store_job_skills(offer_id, skills_data):
-    """Stores the skills information for a job offer in the database."""
+    """Stores the skills information for a job offer in the database.
+
+    Single-offer counterpart of store_job_details_bulk, kept as public API.
+    """
     session = Session()
     try:
         # Mark as retrieved even if no skills data
@@ -215,24 +409,7 @@ def store_job_skills(offer_id, skills_data):
             session.commit()
             return True
         
-        # Delete existing skills
-        session.query(JobSkill).filter(JobSkill.offer_id == offer_id).delete()
-        
-        # Insert new skills
-        skills_added = 0
-        for category in ['must', 'nice', 'extra']:
-            if category in skills_data and skills_data[category]:
-                for skill in skills_data[category]:
-                    job_skill = JobSkill(
-                        offer_id=offer_id,
-                        category=category,
-                        skill_name=skill.get('skill', ''),
-                        skill_icon=skill.get('icon', ''),
-                        skill_level=skill.get('level', 0),
-                        skill_desc=skill.get('desc', '')
-                    )
-                    session.add(job_skill)
-                    skills_added += 1
+        skills_added = _replace_job_skills(session, offer_id, skills_data)
         
         session.commit()
         logger.info(f"Successfully stored/updated {skills_added} skills for offer ID {offer_id}")
@@ -246,7 +423,10 @@ def store_job_skills(offer_id, skills_data):
 
 
 def store_job_languages(offer_id, languages_data):
-    """Stores the language requirements for a job offer in the database."""
+    """Stores the language requirements for a job offer in the database.
+
+    Single-offer counterpart of store_job_details_bulk, kept as public API.
+    """
     session = Session()
     try:
         # Check if offer exists
@@ -259,19 +439,7 @@ def store_job_languages(offer_id, languages_data):
             logger.warning(f"No language data provided for offer ID {offer_id}")
             return False
         
-        # Delete existing languages
-        session.query(JobLanguage).filter(JobLanguage.offer_id == offer_id).delete()
-        
-        # Insert new languages
-        languages_added = 0
-        for language in languages_data:
-            job_language = JobLanguage(
-                offer_id=offer_id,
-                language_name=language.get('name', ''),
-                language_level=language.get('level', '')
-            )
-            session.add(job_language)
-            languages_added += 1
+        languages_added = _replace_job_languages(session, offer_id, languages_data)
         
         session.commit()
         logger.info(f"Successfully stored/updated {languages_added} languages for offer ID {offer_id}")
@@ -284,6 +452,56 @@ def store_job_languages(offer_id, languages_data):
         session.close()
 
 
+def store_job_details_bulk(entries):
+    """Stores skills and languages for several offers in one transaction.
+
+    ``entries`` are (offer_id, skills_data, languages_data) tuples; every existing offer is
+    marked as skills-retrieved, and empty skills/languages leave the stored ones untouched,
+    as with store_job_skills/store_job_languages. An offer whose rows fail to write is
+    skipped and logged without affecting the others. Returns the set of offer IDs written
+    (empty if the transaction failed and was rolled back).
+    """
+    if not entries:
+        return set()
+
+    session = Session()
+    try:
+        offer_ids = [offer_id for offer_id, _, _ in entries]
+        job_offers = {
+            offer.offer_id: offer
+            for offer in session.query(JobOffer).filter(JobOffer.offer_id.in_(offer_ids))
+        }
+        stored = set()
+        for offer_id, skills_data, languages_data in entries:
+            job_offer = job_offers.get(offer_id)
+            if not job_offer:
+                logger.warning(f"Attempted to store details for non-existent offer ID {offer_id}")
+                continue
+            # One SAVEPOINT per offer: a bad row rolls back only that offer, which stays
+            # pending, instead of the whole batch
+            try:
+                with session.begin_nested():
+                    job_offer.skills_retrieved = True
+                    if skills_data:
+                        _replace_job_skills(session, offer_id, skills_data)
+                    if languages_data:
+                        _replace_job_languages(session, offer_id, languages_data)
+            except Exception as e:
+                logger.error(f"Error storing details for offer ID {offer_id}, skipping it: {e}")
+                continue
+            stored.add(offer_id)
+
+        session.commit()
+        logger.info(f"Stored details for {len(stored)}/{len(entries)} offers in one transaction")
+        return stored
+    except Exception as e:
+        logger.error(f"Error storing details for offers {[entry[0] for entry in entries]}: {e}", exc_info=True)
+        session.rollback()
+        return set()
+    finally:
+        session.close()
+
+
 def get_job_skills_from_db(offer_id):
     """Retrieves the skills for a specific job offer from the database."""
     result = {'must': [], 'nice': [], 'extra': []}
@@ -296,14 +514,14 @@ def get_job_skills_from_db(offer_id):
             return result
         
         if not job_offer.skills_retrieved:
-            logger.debug(f"No skills found in DB for offer ID {offer_id}, skills not yet retrieved.")
+            logger.debug("No skills found in DB for offer ID %s, skills not yet retrieved.", offer_id)
             return result
         
         # Get skills
         skills = session.query(JobSkill).filter(JobSkill.offer_id == offer_id).all()
         
         if not skills:
-            logger.debug(f"No skills found in DB for offer ID {offer_id}, but marked as retrieved.")
+            logger.debug("No skills found in DB for offer ID %s, but marked as retrieved.", offer_id)
             return result
         
         for skill in skills:
@@ -324,6 +542,45 @@ def get_job_skills_from_db(offer_id):
         session.close()
 
 
+def get_offer_skills_and_languages(offer_id):
+    """
+    Retrieves an offer's skills and languages in one session: the offer's existence and its
+    skills come from a single LEFT JOIN, the languages from one more query.
+    Returns None if the offer doesn't exist, else {'skills': {...}, 'languages': [...]}
+    shaped like get_job_skills_from_db/get_job_languages_from_db.
+    """
+    session = Session()
+    try:
+        rows = session.query(JobOffer.skills_retrieved, JobSkill)\
+            .outerjoin(JobSkill, JobSkill.offer_id == JobOffer.offer_id)\
+            .filter(JobOffer.offer_id == offer_id)\
+            .all()
+        if not rows:
+            return None
+
+        skills = {'must': [], 'nice': [], 'extra': []}
+        for skills_retrieved, skill in rows:
+            # Skills stored before retrieval completed are not reported, as in get_job_skills_from_db
+            if skills_retrieved and skill is not None and skill.category in skills:
+                skills[skill.category].append({
+                    'skill': skill.skill_name,
+                    'icon': skill.skill_icon,
+                    'level': skill.skill_level,
+                    'desc': skill.skill_desc
+                })
+
+        languages = [
+            {'name': language.language_name, 'level': language.language_level}
+            for language in session.query(JobLanguage).filter(JobLanguage.offer_id == offer_id)
+        ]
+        return {'skills': skills, 'languages': languages}
+    except Exception as e:
+        logger.error(f"Failed to retrieve skills and languages for offer ID {offer_id}: {e}", exc_info=True)
+        return None
+    finally:
+        session.close()
+
+
 def get_job_languages_from_db(offer_id):
     """Retrieves the language requirements for a specific job offer from the database."""
     result = []
@@ -332,7 +589,7 @@ def get_job_languages_from_db(offer_id):
         languages = session.query(JobLanguage).filter(JobLanguage.offer_id == offer_id).all()
         
         if not languages:
-            logger.debug(f"No language requirements found in DB for offer ID {offer_id}")
+            logger.debug("No language requirements found in DB for offer ID %s", offer_id)
             return result
         
         for language in languages:
@@ -349,6 +606,88 @@ def get_job_languages_from_db(offer_id):
         session.close()
 
 
+def get_skills_retrieved_offer_ids(offer_ids):
+    """Returns the subset of offer_ids that exist and have had their skills retrieved."""
+    if not offer_ids:
+        return set()
+
+    session = Session()
+    try:
+        rows = session.query(JobOffer.offer_id)\
+            .filter(JobOffer.offer_id.in_(list(offer_ids)))\
+            .filter(JobOffer.skills_retrieved == True)\
+            .all()
+        return {row.offer_id for row in rows}
+    except Exception as e:
+        logger.error(f"Failed to check skills status for offer IDs {list(offer_ids)}: {e}", exc_info=True)
+        return set()
+    finally:
+        session.close()
+
+
+def get_job_skills_from_db_bulk(offer_ids):
+    """Retrieves the skills for several job offers in one query, keyed by offer ID.
+
+    Offers whose skills have not been retrieved yet (or that don't exist) map to the
+    empty ``{'must': [], 'nice': [], 'extra': []}`` shape, like get_job_skills_from_db.
+    """
+    result = {offer_id: {'must': [], 'nice': [], 'extra': []} for offer_id in offer_ids}
+    if not result:
+        return result
+
+    session = Session()
+    try:
+        skills = session.query(JobSkill)\
+            .join(JobOffer, JobOffer.offer_id == JobSkill.offer_id)\
+            .filter(JobSkill.offer_id.in_(list(result)))\
+            .filter(JobOffer.skills_retrieved == True)\
+            .all()
+
+        for skill in skills:
+            categories = result.get(skill.offer_id)
+            if categories is not None and skill.category in categories:
+                categories[skill.category].append({
+                    'skill': skill.skill_name,
+                    'icon': skill.skill_icon,
+                    'level': skill.skill_level,
+                    'desc': skill.skill_desc
+                })
+
+        return result
+    except Exception as e:
+        logger.error(f"Failed to bulk-retrieve skills for offer IDs {list(result)} from DB, returning empty. Error: {e}", exc_info=True)
+        return {offer_id: {'must': [], 'nice': [], 'extra': []} for offer_id in offer_ids}
+    finally:
+        session.close()
+
+
+def get_job_languages_from_db_bulk(offer_ids):
+    """Retrieves the language requirements for several job offers in one query, keyed by offer ID."""
+    result = {offer_id: [] for offer_id in offer_ids}
+    if not result:
+        return result
+
+    session = Session()
+    try:
+        languages = session.query(JobLanguage)\
+            .filter(JobLanguage.offer_id.in_(list(result)))\
+            .all()
+
+        for language in languages:
+            if language.offer_id in result:
+                result[language.offer_id].append({
+                    'name': language.language_name,
+                    'level': language.language_level
+                })
+
+        return result
+    except Exception as e:
+        logger.error(f"Failed to bulk-retrieve languages for offer IDs {list(result)} from DB, returning empty. Error: {e}", exc_info=True)
+        return {offer_id: [] for offer_id in offer_ids}
+    finally:
+        session.close()
+
+
 def get_pending_skill_offers(limit=10):
     """Retrieves job offers that need skills details fetched."""
     session = Session()
@@ -390,13 +729,23 @@ def update_notification_status(offer_ids):
 
 
 def get_pending_notification_offers(limit=10):
-    """Retrieves job offers that have not had notifications sent."""
+    """Retrieves job offers that have not had notifications sent (see get_pending_notification_page)."""
+    return get_pending_notification_page(limit)[0]
+
+
+def get_pending_notification_page(limit=10):
+    """
+    Retrieves up to ``limit`` job offers that have not had notifications sent, together
+    with the total number pending. Both come from one query via a COUNT(*) OVER () window.
+    Returns (offers, pending_total).
+    """
     session = Session()
     try:
         offers = session.query(
             JobOffer.offer_id, JobOffer.position, JobOffer.company_name, 
             JobOffer.remote_percentage, JobOffer.salary_from, JobOffer.salary_to,
-            JobOffer.locations, JobOffer.company_logo_dark_url, JobOffer.slug
+            JobOffer.locations, JobOffer.company_logo_dark_url, JobOffer.slug,
+            func.count().over().label('pending_total')
         ).filter(JobOffer.notification_sent == False)\
         .order_by(JobOffer.timestamp.desc())\
         .limit(limit)\
@@ -416,22 +765,35 @@ def get_pending_notification_offers(limit=10):
                 'slug': offer.slug
             } 
             for offer in offers
-        ]
+        ], (offers[0].pending_total if offers else 0)
     except Exception as e:
         logger.error(f"Error fetching pending notification offers: {e}", exc_info=True)
-        return []
+        return [], 0
     finally:
         session.close()
 
 
 def store_or_update_offers(offers):
-    """Stores new offers or updates existing ones in the database. Returns list of new offers."""
+    """
+    Stores new offers or updates existing ones in the database.
+    Returns (new_count, updated_count, new_offer_dicts), where each new offer dict is
+    already shaped for notification.
+    """
     new_count = 0
     updated_count = 0
     new_offer_dicts = []
     
     session = Session()
     try:
+        # Load every already-stored offer of this payload up front instead of one query per offer
+        offer_ids = list({offer_dict.get('id') for offer_dict in offers} - {None})
+        existing_offers = {}
+        for i in range(0, len(offer_ids), _IN_CLAUSE_CHUNK):
+            chunk = offer_ids[i:i + _IN_CLAUSE_CHUNK]
+            for offer in session.query(JobOffer).filter(JobOffer.offer_id.in_(chunk)):
+                existing_offers[offer.offer_id] = offer
+
+        now = datetime.now()
         for offer_dict in offers:
             offer_id = offer_dict.get('id')
             if offer_id is None:
@@ -445,15 +807,15 @@ def store_or_update_offers(offers):
             logo_url = None
             if company_data.get('logoDark') and isinstance(company_data.get('logoDark'), dict):
                 logo_url = company_data.get('logoDark').get('url')
-            slug = offer_dict.get('slug', f"job-{offer_id}")
+            # Stored as given: a made-up slug would only be requested from Manfred and 404
+            slug = offer_dict.get('slug') or None
             remote = offer_dict.get('remotePercentage')
             salary_from = offer_dict.get('salaryFrom')
             salary_to = offer_dict.get('salaryTo')
-            locations = offer_dict.get('locations', [])
-            locations_str = ', '.join(str(loc) for loc in locations if loc is not None) if locations else None
+            locations = [str(loc) for loc in offer_dict.get('locations') or [] if loc is not None]
+            locations_json = orjson.dumps(locations).decode() if locations else None
             
-            # Check if offer exists
-            existing_offer = session.query(JobOffer).filter(JobOffer.offer_id == offer_id).first()
+            existing_offer = existing_offers.get(offer_id)
             
             if existing_offer:
                 # Update existing offer
@@ -462,12 +824,12 @@ def store_or_update_offers(offers):
                 existing_offer.remote_percentage = remote
                 existing_offer.salary_from = salary_from
                 existing_offer.salary_to = salary_to
-                existing_offer.locations = locations_str
+                existing_offer.locations = locations_json
                 existing_offer.company_logo_dark_url = logo_url
                 existing_offer.slug = slug
-                existing_offer.timestamp = datetime.now()
+                existing_offer.timestamp = now
                 updated_count += 1
-                logger.debug(f"Updated existing offer ID: {offer_id}")
+                logger.debug("Updated existing offer ID: %s", offer_id)
             else:
                 # Create new offer
                 new_offer = JobOffer(
@@ -477,18 +839,34 @@ def store_or_update_offers(offers):
                     remote_percentage=remote,
                     salary_from=salary_from,
                     salary_to=salary_to,
-                    locations=locations_str,
+                    locations=locations_json,
                     company_logo_dark_url=logo_url,
                     slug=slug,
-                    timestamp=datetime.now(),
+                    timestamp=now,
                     notification_sent=False,
                     skills_retrieved=False,
                     discord_message_id=None
                 )
                 session.add(new_offer)
+                # A repeated ID later in the same payload updates this row instead
+                existing_offers[offer_id] = new_offer
                 new_count += 1
-                new_offer_dicts.append(offer_dict)
-                logger.debug(f"Inserted new offer ID: {offer_id}")
+                # Shaped for discord_notifier.send_batch_notifications so callers need no re-read
+                new_offer_dicts.append({
+                    'id': offer_id,
+                    'position': position,
+                    'company': {
+                        'name': company_name,
+                        'logoDark': {'url': logo_url} if logo_url else None
+                    },
+                    'remotePercentage': remote,
+                    'salaryFrom': salary_from,
+                    'salaryTo': salary_to,
+                    'locations': locations,
+                    # As stored; the embed builder falls back to job-<id> for the link
+                    'slug': slug
+                })
+                logger.debug("Inserted new offer ID: %s", offer_id)
         
         session.commit()
         logger.info(f"Database storage complete. New: {new_count}, Updated: {updated_count}")
@@ -502,6 +880,27 @@ def store_or_update_offers(offers):
         session.close()
 
 
+def _offer_to_dict(offer):
+    """Converts a JobOffer row to the plain dictionary the service layer works with."""
+    return {
+        'offer_id': offer.offer_id,
+        'position': offer.position,
+        'company_name': offer.company_name,
+        'remote_percentage': offer.remote_percentage,
+        'salary_from': offer.salary_from,
+        'salary_to': offer.salary_to,
+        'locations': offer.locations,
+        'company_logo_dark_url': offer.company_logo_dark_url,
+        'slug': offer.slug,
+        'timestamp': offer.timestamp,
+        'notification_sent': offer.notification_sent,
+        'skills_retrieved': offer.skills_retrieved,
+        'discord_message_id': offer.discord_message_id,
+        'relevance_score': offer.relevance_score,
+        'relevance_reason': offer.relevance_reason,
+        'filter_processed': offer.filter_processed
+    }
+
 def get_offer_by_id(offer_id):
     """Retrieves a single job offer by its ID."""
     session = Session()
@@ -512,24 +911,7 @@ def get_offer_by_id(offer_id):
             return None
         
         # Convert SQLAlchemy model to dictionary
-        return {
-            'offer_id': offer.offer_id,
-            'position': offer.position,
-            'company_name': offer.company_name,
-            'remote_percentage': offer.remote_percentage,
-            'salary_from': offer.salary_from,
-            'salary_to': offer.salary_to,
-            'locations': offer.locations,
-            'company_logo_dark_url': offer.company_logo_dark_url,
-            'slug': offer.slug,
-            'timestamp': offer.timestamp,
-            'notification_sent': offer.notification_sent,
-            'skills_retrieved': offer.skills_retrieved,
-            'discord_message_id': offer.discord_message_id,
-            'relevance_score': offer.relevance_score,
-            'relevance_reason': offer.relevance_reason,
-            'filter_processed': offer.filter_processed
-        }
+        return _offer_to_dict(offer)
     except Exception as e:
         logger.error(f"Error fetching offer by ID {offer_id}: {e}", exc_info=True)
         return None
@@ -581,14 +963,23 @@ def update_discord_message_id(offer_id, message_id):
 
 # New function to find obsolete notifications
 def get_obsolete_discord_notifications(active_offer_ids):
-    """Retrieves job offers that have Discord message IDs but are no longer in the active offers list."""
+    """Retrieves job offers that have Discord message IDs but are no longer in the active offers list.
+
+    A message shared by several offers (see DISCORD_EMBEDS_PER_MESSAGE) is only
+    obsolete once none of the offers in it is active any more.
+    """
     session = Session()
     try:
+        messages_still_active = session.query(JobOffer.discord_message_id)\
+            .filter(JobOffer.offer_id.in_(active_offer_ids))\
+            .filter(JobOffer.discord_message_id != None)
+
         offers = session.query(
             JobOffer.offer_id, JobOffer.discord_message_id
         ).filter(JobOffer.discord_message_id != None)\
         .filter(JobOffer.discord_message_id != '')\
         .filter(~JobOffer.offer_id.in_(active_offer_ids))\
+        .filter(~JobOffer.discord_message_id.in_(messages_still_active))\
         .all()
         
         # Convert SQLAlchemy result to list of dictionaries
@@ -606,21 +997,24 @@ def get_obsolete_discord_notifications(active_offer_ids):
         session.close()
 
 # New function to clear Discord message ID
-def clear_discord_message_id(offer_id):
-    """Clears the Discord message ID for a job offer."""
+def clear_discord_message_ids(offer_ids):
+    """Clears the Discord message ID for several job offers in one statement. Returns the number of rows updated."""
+    if not offer_ids:
+        return 0
+
     session = Session()
     try:
         result = session.query(JobOffer)\
-            .filter(JobOffer.offer_id == offer_id)\
+            .filter(JobOffer.offer_id.in_(list(offer_ids)))\
             .update({JobOffer.discord_message_id: None}, synchronize_session=False)
-        
+
         session.commit()
-        logger.info(f"Cleared Discord message ID for offer ID {offer_id}")
-        return result > 0
+        logger.info(f"Cleared Discord message IDs for {result} offers")
+        return result
     except Exception as e:
-        logger.error(f"Failed to clear Discord message ID for offer ID {offer_id}: {e}", exc_info=True)
+        logger.error(f"Failed to clear Discord message IDs for offers {list(offer_ids)}: {e}", exc_info=True)
         session.rollback()
-        return False
+        return 0
     finally:
         session.close()
 # --- END OF FILE database.py ---
\ No newline at end of file
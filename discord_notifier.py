@@ -1,38 +1,199 @@
 # --- START OF FILE discord_notifier.py ---
 import logging
+import random
+import threading
 import time
-import json
-from datetime import datetime
-from discord_webhook import DiscordWebhook, DiscordEmbed
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+import httpx
+import orjson
+from pydantic import BaseModel, ValidationError, field_validator
 
 from config import CONFIG
-from database import get_job_skills_from_db, get_job_languages_from_db
+from database import (
+    get_job_skills_from_db, get_job_languages_from_db,
+    get_job_skills_from_db_bulk, get_job_languages_from_db_bulk,
+    get_offer_by_id, get_skills_retrieved_offer_ids, update_discord_message_id,
+)
 
 logger = logging.getLogger(__name__)
 
-# Global client for Discord webhooks
-discord_client = None
+# Persistent httpx Client for direct Discord API calls, with its own connection pool
+# so webhook bursts reuse TLS connections to discord.com instead of competing with
+# (or falling out of) the Manfred client's pool.
+discord_client = httpx.Client(
+    timeout=15.0,
+    limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+    headers={"Content-Type": "application/json"}
+)
 
 def close_discord_client():
-    """Close any HTTP clients to free resources."""
-    # discord-webhook library doesn't have a specific close method
-    # but we include this for symmetry with other close functions
-    logger.info("Discord client resources released")
+    """Close the Discord HTTP client to free resources."""
+    try:
+        discord_client.close()
+        logger.info("Discord client resources released")
+    except Exception as e:
+        logger.error("Error closing Discord client: %s", e)
+
+# Static parts of every job-offer embed, built once at import.
+_EMBED_COLOR = 5814783  # Manfred purple-ish color
+_EMBED_FOOTER = {"text": "Via Manfred Job Fetcher"}
+_JOB_URL_PREFIX = "https://www.getmanfred.com/es/job-offers/"
+_COMMA_TO_DOT = str.maketrans(',', '.')
+_MAX_EMBEDS_PER_MESSAGE = 10  # Discord's per-message embed limit
+_MAX_EMBED_CHARS_PER_MESSAGE = 6000  # Discord's limit on the combined text of a message's embeds
+# Skill level suffixes indexed by level (Manfred levels are 1-5)
+_LEVEL_STRS = ("", " (★)", " (★★)", " (★★★)", " (★★★★)", " (★★★★★)")
+# Skill categories in display order, with their embed field names
+_SKILL_FIELDS = (
+    ("must", "🔒 Must Have Skills"),
+    ("nice", "✨ Nice to Have Skills"),
+    ("extra", "📚 Extra Skills"),
+)
+_MAX_PARALLEL_POSTS = 5  # concurrent webhook messages per batch (the token bucket still paces them)
+
+# --- Offer schema ---
+class _EmbedCompany(BaseModel):
+    name: str = 'Unknown Company'
+    logoDark: Optional[dict] = None
+
+
+class _EmbedOffer(BaseModel):
+    """
+    The fields of an offer dict (Manfred API shape) that the embed builder reads,
+    validated once up front instead of probed with scattered .get() calls.
+    """
+    id: int
+    position: str = 'Unknown Position'
+    company: _EmbedCompany = _EmbedCompany()
+    slug: Optional[str] = None
+    salaryFrom: Optional[int] = None
+    salaryTo: Optional[int] = None
+    remotePercentage: Optional[int] = None
+    locations: List[str] = []
+    relevance_score: Optional[int] = None
+    relevance_reason: Optional[str] = None
+
+    @field_validator('company', mode='before')
+    @classmethod
+    def _default_company(cls, value: Any):
+        return value if value is not None else {}
+
+    @field_validator('salaryFrom', 'salaryTo', 'remotePercentage', 'relevance_score', mode='before')
+    @classmethod
+    def _round_numbers(cls, value: Any):
+        """Accept fractional floats and numeric strings (e.g. 45000.5, "80"), rounded to int."""
+        if isinstance(value, (float, str)) and not isinstance(value, bool):
+            try:
+                return round(float(value))
+            except (ValueError, OverflowError):
+                return value  # left for the int check to reject
+        return value
+
+    @field_validator('locations', mode='before')
+    @classmethod
+    def _clean_locations(cls, value: Any):
+        """Treat a missing/non-list value as no locations and drop null entries."""
+        if not isinstance(value, list):
+            return []
+        return [str(loc) for loc in value if loc is not None]
+
+# --- Rate limiting ---
+class _TokenBucket:
+    """
+    Thread-safe token bucket allowing up to ``rate`` acquisitions per ``period`` seconds.
+    Bursts go through at full speed while tokens remain; acquire() only sleeps once
+    the bucket is empty, for just as long as the next token takes to refill.
+    pause() holds back every caller until a server-advertised reset time, so one
+    thread's 429 slows all senders down instead of each finding out on its own.
+    """
+
+    def __init__(self, rate, period):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        with self._lock:
+            wait = self._blocked_until - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.period)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                time.sleep((1 - self._tokens) * self.period / self.rate)
+
+# Discord allows 5 webhook executions per 2 seconds
+_discord_limiter = _TokenBucket(5, 2)
+
+
+class _CircuitBreaker:
+    """
+    Thread-safe circuit breaker: after ``threshold`` consecutive failures it opens
+    for ``cooldown`` seconds, during which allow() is False so callers fail fast
+    instead of hammering a failing endpoint. One success closes it again.
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        return time.monotonic() >= self._open_until
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._open_until = 0.0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._open_until = time.monotonic() + self.cooldown
+                logger.warning("Discord webhook failed %s times in a row; pausing notifications for %ss", self._failures, self.cooldown)
+
+# Stop posting to Discord for 30s after 5 consecutive server errors / network failures
+_discord_breaker = _CircuitBreaker(5, 30)
 
 # --- Helper Functions ---
+def _fmt_eur(amount):
+    """Formats an integer amount as euros with dot thousands separators (40000 -> 40.000€)."""
+    return format(amount, ',').translate(_COMMA_TO_DOT) + '€'
+
 def _format_skills_for_field(skill_list):
     """Formats a list of skill dictionaries into a string for an embed field."""
     if not skill_list:
         return None
     lines = []
+    total = 0
+    get = dict.get  # bound once: skips the per-call method lookup in the loop
     for skill in skill_list:
-        level_stars = "★" * skill.get('level', 0) if skill.get('level') else ""
-        level_part = f" ({level_stars})" if level_stars else ""
-        skill_name = skill.get('skill', 'N/A')
-        lines.append(f"• {skill_name}{level_part}")
-    formatted_value = "\n".join(lines)
-    # Discord field value limit is 1024 characters
-    return formatted_value[:1020] + "..." if len(formatted_value) > 1020 else formatted_value
+        level = get(skill, 'level') or 0
+        level_part = _LEVEL_STRS[min(max(level, 0), 5)]  # out-of-range levels clamp to 0..5
+        line = f"• {get(skill, 'skill', 'N/A')}{level_part}"
+        # Discord field value limit is 1024 characters: stop as soon as the next
+        # line (plus its newline) would overflow, rather than building then slicing.
+        if total + len(line) + 1 > 1020:
+            lines.append("...")
+            break
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
 
 def _format_language_for_field(language_list):
     """Formats a list of language dictionaries into a string for an embed field."""
@@ -40,250 +201,374 @@ def _format_language_for_field(language_list):
         return None
 
     lines = []
+    total = 0
+    get = dict.get
     for language in language_list:
-        name = language.get('name', 'N/A')
-        level = language.get('level', 'N/A')
+        level = get(language, 'level', 'N/A')
         # Format level more user-friendly
         level_display = level.capitalize() if level else 'N/A'
-        lines.append(f"• {name}: {level_display}")
-
-    formatted_value = "\n".join(lines)
-    # Discord field value limit is 1024 characters
-    return formatted_value[:1020] + "..." if len(formatted_value) > 1020 else formatted_value
-
-# --- Embed Builder ---
-def _build_discord_embed(offer_dict):
+        line = f"• {get(language, 'name', 'N/A')}: {level_display}"
+        # Discord field value limit is 1024 characters; stop before overflowing
+        if total + len(line) + 1 > 1020:
+            lines.append("...")
+            break
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
+
+def _field(name, value):
+    """Builds a full-width embed field dict (all job-offer fields are non-inline)."""
+    return {"name": name, "value": value, "inline": False}
+
+def _embed_length(embed):
+    """Counts an embed's characters the way Discord does for its 6000-character message limit."""
+    total = len(embed.get('title') or '') + len(embed.get('description') or '')
+    total += len((embed.get('footer') or {}).get('text') or '')
+    total += len((embed.get('author') or {}).get('name') or '')
+    for field in embed.get('fields') or ():
+        total += len(field.get('name') or '') + len(field.get('value') or '')
+    return total
+
+def _pack_embeds(embeds):
     """
-    Builds a Discord embed for a job offer using discord-webhook library.
-    Returns the embed object or None on failure.
+    Splits ``(offer_id, embed)`` pairs into message-sized groups, starting a new group
+    whenever the next embed would pass Discord's 10-embed or 6000-character limit.
     """
-    offer_id = offer_dict.get('id')
-    if not offer_id:
-        logger.error("Cannot build embed: Offer dictionary missing 'id'.")
-        return None
-
-    # Log that we're building an embed for debugging
-    logger.debug(f"Building Discord embed for offer ID: {offer_id}")
-
-    # Get skills and language data from DB
-    skills_data = get_job_skills_from_db(offer_id)
-    languages_data = get_job_languages_from_db(offer_id)
-    
-    # Log the skills and languages retrieved
-    logger.debug(f"Skills data for offer ID {offer_id}: {skills_data}")
-    logger.debug(f"Languages data for offer ID {offer_id}: {languages_data}")
-
-    position = offer_dict.get('position', 'Unknown Position')
-    company_data = offer_dict.get('company', {})
-    company_name = company_data.get('name', 'Unknown Company')
-    logo_url = company_data.get('logoDark', {}).get('url') if isinstance(company_data.get('logoDark'), dict) else None
-    slug = offer_dict.get('slug', f"job-{offer_id}")
-    job_url = f"https://www.getmanfred.com/es/job-offers/{offer_id}/{slug}" # Calculate URL first
-
-    # Create the embed with the DiscordEmbed class, adding the URL to the title
-    embed = DiscordEmbed(
-        title=f"{position} @ {company_name}",
-        description="",  # Optional summary could go here
-        color=5814783,  # Manfred purple-ish color
-        url=job_url      # Make the title a link
-    )
-
-    # Set timestamp and footer
-    embed.set_timestamp()
-    embed.set_footer(text="Via Manfred Job Fetcher")
-
-    # Set thumbnail if logo URL is available
-    if logo_url:
-        embed.set_thumbnail(url=logo_url)
+    groups = []
+    current = []
+    current_chars = 0
+    for offer_id, embed in embeds:
+        chars = _embed_length(embed)
+        if current and (len(current) >= _MAX_EMBEDS_PER_MESSAGE or current_chars + chars > _MAX_EMBED_CHARS_PER_MESSAGE):
+            groups.append(current)
+            current = []
+            current_chars = 0
+        current.append((offer_id, embed))
+        current_chars += chars
+    if current:
+        groups.append(current)
+    return groups
+
+def _retry_after_seconds(response):
+    """
+    Returns how long Discord asked us to wait after a 429: the Retry-After or
+    X-RateLimit-Reset-After header, else the body's retry_after, else 1 second.
+    Capped at RETRY_MAX_SLEEP so a huge value can't stall every sender for that long.
+    """
+    wait = None
+    for header in ('Retry-After', 'X-RateLimit-Reset-After'):
+        value = response.headers.get(header)
+        if value is not None:
+            try:
+                wait = float(value)
+                break
+            except ValueError:
+                pass
+    if wait is None:
+        try:
+            wait = float(orjson.loads(response.content).get('retry_after', 1.0))
+        except Exception:
+            wait = 1.0
+    return min(wait, CONFIG['RETRY_MAX_SLEEP'])
+
+def _execute_webhook(webhook_url, payload):
+    """
+    POSTs a webhook message payload (a plain dict in Discord's JSON schema) through
+    the pooled discord_client, serialized with orjson.
+    Returns the httpx response.
+    """
+    return _discord_request('POST', webhook_url, content=orjson.dumps(payload), params={"wait": "true"})
 
+def _discord_request(method, url, **kwargs):
+    """
+    Sends one request to Discord through the pooled discord_client, paced by the
+    shared token bucket. A 429 is retried after the advertised delay plus a little
+    jitter (up to MAX_RETRIES times). Server errors and network failures feed the
+    circuit breaker. Returns the httpx response.
+    """
+    try:
+        _discord_limiter.acquire()
+        response = discord_client.request(method, url, **kwargs)
+        retries = 0
+        while response.status_code == 429 and retries < CONFIG['MAX_RETRIES']:
+            retries += 1
+            # Small jitter so concurrent senders don't all retry in the same instant
+            delay = _retry_after_seconds(response) + random.uniform(0, 0.5)
+            logger.warning("Discord webhook rate limited. Retrying in %.2fs (%s/%s)", delay, retries, CONFIG['MAX_RETRIES'])
+            _discord_limiter.pause(delay)
+            _discord_limiter.acquire()
+            response = discord_client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        _discord_breaker.record_failure()
+        raise
+
+    # Discord tells us when the bucket is drained; hold all senders until it resets
+    if response.headers.get('X-RateLimit-Remaining') == '0':
+        try:
+            _discord_limiter.pause(min(float(response.headers.get('X-RateLimit-Reset-After', 0)), CONFIG['RETRY_MAX_SLEEP']))
+        except ValueError:
+            pass
+
+    if response.status_code >= 500:
+        _discord_breaker.record_failure()
+    else:
+        _discord_breaker.record_success()
+    return response
+
+def _offer_fields(salary_from, salary_to, remote_percentage, locations, relevance_score,
+                  relevance_reason, languages_data, skills_data):
+    """Returns an offer's embed fields as a list of ``(name, value)`` pairs, skipping empty ones."""
     # Prepare job details field content
     info_lines = []
 
     # Salary information
-    salary_from = offer_dict.get('salaryFrom')
-    salary_to = offer_dict.get('salaryTo')
     if salary_from and salary_to:
-        salary_text = f"{salary_from:,}€ - {salary_to:,}€".replace(',', '.')
-        info_lines.append(f"💰 **Salary:** {salary_text}")
+        info_lines.append(f"💰 **Salary:** {_fmt_eur(salary_from)} - {_fmt_eur(salary_to)}")
     elif salary_from:
-        salary_text = f"From {salary_from:,}€".replace(',', '.')
-        info_lines.append(f"💰 **Salary:** {salary_text}")
+        info_lines.append(f"💰 **Salary:** From {_fmt_eur(salary_from)}")
     elif salary_to:
-        salary_text = f"Up to {salary_to:,}€".replace(',', '.')
-        info_lines.append(f"💰 **Salary:** {salary_text}")
+        info_lines.append(f"💰 **Salary:** Up to {_fmt_eur(salary_to)}")
 
     # Remote work information
-    remote_percentage = offer_dict.get('remotePercentage')
     if remote_percentage is not None:
         info_lines.append(f"🏠 **Remote:** {remote_percentage}% Remote")
 
     # Location information
-    locations = offer_dict.get('locations', [])
-    if locations and isinstance(locations, list):
-        locations_text = f"{', '.join(locations)}"
-        info_lines.append(f"📍 **Location:** {locations_text}")
-
-    # Add job details field
-    if info_lines:
-        embed.add_embed_field(
-            name="📋 Job Details",
-            value="\n".join(info_lines),
-            inline=False
-        )
+    if locations:
+        info_lines.append(f"📍 **Location:** {', '.join(locations)}")
 
     # Relevance match reason (present when the AI/rules filter is active)
-    relevance_reason = offer_dict.get('relevance_reason')
-    if relevance_reason:
-        score = offer_dict.get('relevance_score')
-        field_name = f"🤖 Why it matched ({score}/100)" if score is not None else "🤖 Why it matched"
-        embed.add_embed_field(
-            name=field_name,
-            value=relevance_reason[:1020],
-            inline=False
-        )
+    if relevance_score is not None:
+        relevance_name = f"🤖 Why it matched ({relevance_score}/100)"
+    else:
+        relevance_name = "🤖 Why it matched"
+
+    candidates = [
+        ("📋 Job Details", "\n".join(info_lines)),
+        (relevance_name, relevance_reason[:1020] if relevance_reason else None),
+        ("🌐 Language Requirements", _format_language_for_field(languages_data)),
+    ]
+    candidates.extend(
+        (name, _format_skills_for_field(skills_data.get(category, [])))
+        for category, name in _SKILL_FIELDS
+    )
+    # Fields without content are left out in a single pass
+    return [(name, value) for name, value in candidates if value]
 
-    # Add language requirements field
-    languages_text = _format_language_for_field(languages_data)
-    if languages_text:
-        embed.add_embed_field(
-            name="🌐 Language Requirements",
-            value=languages_text,
-            inline=False
-        )
+# --- Embed Builder ---
+def _build_discord_embed(offer_dict, skills=None, languages=None, timestamp=None):
+    """
+    Builds the Discord embed dict for a job offer.
+    Pre-fetched ``skills``/``languages`` are used when given; otherwise they are
+    read from the DB for this offer. ``timestamp`` (ISO string) lets a batch share
+    one timestamp; defaults to now.
+    Returns the embed dict, or None on failure. An offer with nothing to show (no
+    details, relevance reason, languages or skills) gets an embed with no fields.
+    """
+    offer_id = offer_dict.get('id')
+    if not offer_id:
+        logger.error("Cannot build embed: Offer dictionary missing 'id'.")
+        return None
 
-    # Add skills fields
-    must_skills_text = _format_skills_for_field(skills_data.get('must', []))
-    if must_skills_text:
-        embed.add_embed_field(
-            name="🔒 Must Have Skills",
-            value=must_skills_text,
-            inline=False
-        )
+    try:
+        offer = _EmbedOffer.model_validate(offer_dict)
+    except ValidationError as e:
+        logger.error("Cannot build embed for offer ID %s: invalid offer data: %s", offer_id, e)
+        return None
 
-    nice_skills_text = _format_skills_for_field(skills_data.get('nice', []))
-    if nice_skills_text:
-        embed.add_embed_field(
-            name="✨ Nice to Have Skills",
-            value=nice_skills_text,
-            inline=False
-        )
+    # Log that we're building an embed for debugging
+    logger.debug("Building Discord embed for offer ID: %s", offer_id)
 
-    extra_skills_text = _format_skills_for_field(skills_data.get('extra', []))
-    if extra_skills_text:
-        embed.add_embed_field(
-            name="📚 Extra Skills",
-            value=extra_skills_text,
-            inline=False
-        )
+    # Get skills and language data from DB unless the caller pre-fetched them
+    skills_data = skills if skills is not None else get_job_skills_from_db(offer_id)
+    languages_data = languages if languages is not None else get_job_languages_from_db(offer_id)
+    
+    # Log the skills and languages retrieved (lazy args: only rendered when DEBUG is on)
+    logger.debug("Skills data for offer ID %s: %s", offer_id, skills_data)
+    logger.debug("Languages data for offer ID %s: %s", offer_id, languages_data)
 
-    return embed # Return only the embed object
+    logo_url = offer.company.logoDark.get('url') if offer.company.logoDark else None
+    slug = offer.slug or f"job-{offer_id}"
+    job_url = f"{_JOB_URL_PREFIX}{offer_id}/{slug}" # Calculate URL first
+
+    field_pairs = _offer_fields(
+        offer.salaryFrom, offer.salaryTo, offer.remotePercentage, offer.locations,
+        offer.relevance_score, offer.relevance_reason, languages_data, skills_data,
+    )
+    fields = [_field(name, value) for name, value in field_pairs]
+
+    # Plain dict in Discord's embed schema, with the URL on the title and the
+    # company logo (if available) as thumbnail
+    embed = {
+        "title": f"{offer.position} @ {offer.company.name}",
+        "url": job_url,  # Make the title a link
+        "color": _EMBED_COLOR,
+        "footer": dict(_EMBED_FOOTER),
+        "fields": fields,
+        "timestamp": timestamp or datetime.now(timezone.utc).isoformat(),
+    }
+    if logo_url:
+        embed["thumbnail"] = {"url": logo_url}
+
+    return embed
 
 # --- Notification Sender (Single) ---
-def send_discord_notification(offer_dict):
+def send_discord_notification(offer_dict, skills=None, languages=None, timestamp=None):
     """
     Sends a single job offer notification to the configured Discord webhook.
+    ``skills``/``languages``/``timestamp`` may be pre-computed by the caller
+    (see send_batch_notifications).
     Returns True on success, False on failure.
     """
+    # Check the webhook first so disabled deployments skip all DB work
     webhook_url = CONFIG.get('DISCORD_WEBHOOK_URL')
     if not webhook_url:
         logger.warning("Discord webhook URL not configured. Skipping notification.")
         return False
 
-    # Get offer ID and other details early for URL, content, and logging
-    offer_id = offer_dict.get('id')
+    offer_id = offer_dict.get('id') if isinstance(offer_dict, dict) else None
     if not offer_id:
         logger.error("Cannot send notification: Offer dictionary missing 'id'.")
         return False
-    offer_id_str = str(offer_id) # Use consistent string representation
 
-    position = offer_dict.get('position', 'Unknown Position')
-    company_name = offer_dict.get('company', {}).get('name', 'Unknown Company')
-    slug = offer_dict.get('slug', f"job-{offer_id}")
-    job_url = f"https://www.getmanfred.com/es/job-offers/{offer_id}/{slug}"
+    # Verify skills have been retrieved for this offer
+    db_offer = get_offer_by_id(offer_id)
+    if not db_offer:
+        logger.error("Failed to find offer ID %s in database", offer_id)
+        return False
 
-    try:
-        # Verify skills have been retrieved for this offer
-        from database import get_offer_by_id
-        
-        db_offer = get_offer_by_id(offer_id)
-        if not db_offer:
-            logger.error(f"Failed to find offer ID {offer_id_str} in database")
-            return False
-            
-        if not db_offer.get('skills_retrieved', False):
-            logger.warning(f"Skipping Discord notification for offer ID {offer_id_str} - skills not yet retrieved")
-            return False
-        
-        # Check if there are any skills in the database
-        from database import get_job_skills_from_db
-        skills_data = get_job_skills_from_db(offer_id)
-        
-        has_any_skills = False
-        for category in ['must', 'nice', 'extra']:
-            if skills_data.get(category) and len(skills_data.get(category)) > 0:
-                has_any_skills = True
-                break
-                
-        if not has_any_skills:
-            logger.info(f"Offer ID {offer_id_str} is marked as skills_retrieved=True but no skills found in database")
-        
-        # Build embed (URL is part of the embed title and a dedicated field)
-        embed = _build_discord_embed(offer_dict)
-        if not embed:
-            logger.error(f"Failed to build embed for offer ID {offer_id_str}")
-            return False
+    if not db_offer.get('skills_retrieved', False):
+        logger.warning("Skipping Discord notification for offer ID %s - skills not yet retrieved", offer_id)
+        return False
 
-        # Create webhook content including the job title, company, and link
-        content = f"📢 New Job Offer Found!"
+    sent_ids = _send_offers_message(
+        webhook_url,
+        [offer_dict],
+        skills_by_offer={offer_id: skills} if skills is not None else None,
+        languages_by_offer={offer_id: languages} if languages is not None else None,
+        timestamp=timestamp,
+    )
+    return bool(sent_ids)
 
-        webhook = DiscordWebhook(
-            url=webhook_url,
-            content=content,
-            rate_limit_retry=True,
-            timeout=15
-        )
+def _send_offers_message(webhook_url, offer_dicts, skills_by_offer=None, languages_by_offer=None, timestamp=None):
+    """
+    Sends the offers to ``webhook_url`` (which callers resolve and check once) with one
+    embed per offer, in as few webhook messages as Discord's 10-embed and 6000-character
+    limits allow. Callers also check that every offer's skills have been retrieved, so
+    this does no per-offer DB reads when skills/languages are pre-fetched. Every offer
+    in a message is linked to that message's Discord ID. Offers with nothing beyond a
+    title are not worth a webhook round-trip: they are left out of the message but
+    still count as handled, so they aren't re-selected forever.
+    Returns the list of offer IDs handled (sent, or skipped for having no content); if
+    one of several messages fails, only the other messages' offers are returned.
+    """
+    # Fail fast, before any DB work, while Discord is failing repeatedly
+    if not _discord_breaker.allow():
+        logger.warning("Discord circuit breaker open; skipping notification for %s offer(s)", len(offer_dicts))
+        return []
 
-        # Add the embed to the webhook
-        webhook.add_embed(embed)
+    skills_by_offer = skills_by_offer or {}
+    languages_by_offer = languages_by_offer or {}
+    offer_ids = [offer.get('id') for offer in offer_dicts]
+    offer_ids_str = ", ".join(str(offer_id) for offer_id in offer_ids)
 
-        # Execute the webhook with built-in retry logic
-        response = webhook.execute()
+    try:
+        embeds = []
+        included_ids = []
+        contentless_ids = []
+        for offer_dict in offer_dicts:
+            offer_id = offer_dict.get('id')
+            offer_id_str = str(offer_id) # Use consistent string representation
+
+            # Check if there are any skills in the database
+            skills_data = skills_by_offer.get(offer_id)
+            if skills_data is None:
+                skills_data = get_job_skills_from_db(offer_id)
+
+            has_any_skills = False
+            for category in ['must', 'nice', 'extra']:
+                if skills_data.get(category) and len(skills_data.get(category)) > 0:
+                    has_any_skills = True
+                    break
+
+            if not has_any_skills:
+                logger.info("Offer ID %s is marked as skills_retrieved=True but no skills found in database", offer_id_str)
+
+            # Build embed (URL is part of the embed title)
+            embed = _build_discord_embed(
+                offer_dict,
+                skills=skills_data,
+                languages=languages_by_offer.get(offer_id),
+                timestamp=timestamp
+            )
+            if not embed:
+                logger.warning("No embed built for offer ID %s; leaving it out of the message", offer_id_str)
+                continue
+            if not embed['fields']:
+                logger.info("Offer ID %s has no content to show; marking it handled without a message", offer_id_str)
+                contentless_ids.append(offer_id)
+                continue
+
+            embeds.append(embed)
+            included_ids.append(offer_id)
+
+        # Long skill/language fields can push a full group past Discord's 6000-character
+        # limit, which would reject the whole message; split it so each one fits.
+        handled_ids = []
+        for message_embeds in _pack_embeds(zip(included_ids, embeds)):
+            message_ids = [offer_id for offer_id, _ in message_embeds]
+            if _post_embeds(webhook_url, message_ids, [embed for _, embed in message_embeds]):
+                handled_ids.extend(message_ids)
+        return handled_ids + contentless_ids
 
-        # Check for success and log
-        if isinstance(response, list):
-            response = response[0]  # Get the first response if it's a list
+    except Exception as e:
+        logger.error("Failed to send Discord webhook for offer ID(s) %s: %s", offer_ids_str, e, exc_info=True)
+        return []
 
-        if response and 200 <= response.status_code < 300:
-            try:
-                # Extract message ID from response JSON
-                response_json = response.json()
-                message_id = response_json.get('id')
-                if message_id:
-                    # Update database with message ID
-                    from database import update_discord_message_id
+def _post_embeds(webhook_url, offer_ids, embeds):
+    """
+    Posts one webhook message carrying ``embeds`` and links every offer in ``offer_ids``
+    to the returned Discord message ID. Returns True if Discord accepted the message.
+    """
+    offer_ids_str = ", ".join(str(offer_id) for offer_id in offer_ids)
+
+    # Create webhook content announcing the offer(s)
+    if len(embeds) == 1:
+        content = "📢 New Job Offer Found!"
+    else:
+        content = f"📢 {len(embeds)} New Job Offers Found!"
+
+    # Execute the webhook through the pooled client, retrying on rate limits
+    response = _execute_webhook(webhook_url, {"content": content, "embeds": embeds})
+
+    # Check for success and log
+    if response and 200 <= response.status_code < 300:
+        try:
+            # Extract message ID from response JSON
+            response_json = orjson.loads(response.content)
+            message_id = response_json.get('id')
+            if message_id:
+                # Update database with message ID
+                for offer_id in offer_ids:
                     update_discord_message_id(offer_id, message_id)
-                    logger.info(f"Saved Discord message ID {message_id} for offer ID: {offer_id_str}")
-                else:
-                    logger.warning(f"Could not find message ID in Discord response for offer ID {offer_id_str}")
-            except Exception as e:
-                logger.error(f"Error extracting message ID from Discord response for offer ID {offer_id_str}: {e}")
-                
-            logger.info(f"Successfully sent Discord notification for offer ID: {offer_id_str}")
-            return True
-        else:
-            status_code = getattr(response, 'status_code', 'Unknown')
-            logger.error(f"Failed to send Discord webhook for offer ID {offer_id_str}: HTTP {status_code}")
-            # Log response content if available for debugging
-            try:
-                response_content = response.content.decode('utf-8')
-                logger.error(f"Discord API response content: {response_content}")
-            except Exception:
-                pass # Ignore if decoding fails
-            return False
-
-    except Exception as e:
-        logger.error(f"Failed to send Discord webhook for offer ID {offer_id_str}: {str(e)}", exc_info=True)
-        return False
+                logger.info("Saved Discord message ID %s for offer ID(s): %s", message_id, offer_ids_str)
+            else:
+                logger.warning("Could not find message ID in Discord response for offer ID(s) %s", offer_ids_str)
+        except Exception as e:
+            logger.error("Error extracting message ID from Discord response for offer ID(s) %s: %s", offer_ids_str, e)
+
+        logger.info("Successfully sent Discord notification for offer ID(s): %s", offer_ids_str)
+        return True
+
+    status_code = getattr(response, 'status_code', 'Unknown')
+    logger.error("Failed to send Discord webhook for offer ID(s) %s: HTTP %s", offer_ids_str, status_code)
+    # Log response content if available for debugging
+    try:
+        response_content = response.content.decode('utf-8')
+        logger.error("Discord API response content: %s", response_content)
+    except Exception:
+        pass # Ignore if decoding fails
+    return False
 
 # --- Delete Discord Message ---
 def delete_discord_message(message_id):
@@ -300,7 +585,7 @@ def delete_discord_message(message_id):
         # Extract webhook ID and token from webhook URL
         webhook_parts = webhook_url.split('/')
         if len(webhook_parts) < 7:
-            logger.error(f"Invalid webhook URL format for deleting message {message_id}")
+            logger.error("Invalid webhook URL format for deleting message %s", message_id)
             return False
         
         webhook_id = webhook_parts[-2]
@@ -309,67 +594,116 @@ def delete_discord_message(message_id):
         # Construct delete URL
         delete_url = f"https://discord.com/api/webhooks/{webhook_id}/{webhook_token}/messages/{message_id}"
         
-        # Use the existing http_client from manfred_api.py
-        from manfred_api import http_client
-        response = http_client.delete(delete_url)
+        response = _discord_request('DELETE', delete_url)
         
         # Check for success
         if 200 <= response.status_code < 300 or response.status_code == 404:  # 404 means it's already gone, which is fine
-            logger.info(f"Successfully deleted Discord message {message_id}")
+            logger.info("Successfully deleted Discord message %s", message_id)
             return True
         else:
-            logger.error(f"Failed to delete Discord message {message_id}: HTTP {response.status_code}")
+            logger.error("Failed to delete Discord message %s: HTTP %s", message_id, response.status_code)
             return False
     
     except Exception as e:
-        logger.error(f"Error deleting Discord message {message_id}: {e}", exc_info=True)
+        logger.error("Error deleting Discord message %s: %s", message_id, e, exc_info=True)
         return False
 
+def delete_discord_messages(message_ids):
+    """
+    Deletes several Discord messages concurrently (paced by the shared token bucket).
+    Returns the set of message IDs that are gone.
+    """
+    message_ids = list(dict.fromkeys(message_ids))  # each message once, order kept
+    if not message_ids:
+        return set()
+
+    with ThreadPoolExecutor(max_workers=min(_MAX_PARALLEL_POSTS, len(message_ids))) as executor:
+        results = executor.map(delete_discord_message, message_ids)
+        return {message_id for message_id, deleted in zip(message_ids, results) if deleted}
+
 # --- Notification Sender (Batch) ---
-def send_batch_notifications(offer_dicts, batch_size=5, delay_seconds=1.5):
+def send_batch_notifications(offer_dicts, batch_size=5):
     """
-    Sends a batch of job offers to Discord webhook.
-    Returns the number of successfully sent notifications.
+    Sends a batch of job offers to Discord webhook. Messages are paced by the shared
+    Discord token bucket rather than a fixed delay.
+    Returns the list of offer IDs that were sent. Messages are posted concurrently and
+    any of them may fail, so these are not necessarily the first offers of the batch.
     """
     if not offer_dicts:
         logger.info("No offers provided for batch notification.")
-        return 0
+        return []
 
     webhook_url = CONFIG.get('DISCORD_WEBHOOK_URL')
     if not webhook_url:
         logger.warning("Discord webhook URL not configured. Skipping batch notification.")
-        return 0
+        return []
 
-    sent_count = 0
+    sent_ids = []
     # Process only up to batch_size offers
     offers_to_send = offer_dicts[:batch_size]
 
     if not offers_to_send:
         logger.info("Offer list resulted in an empty batch to send.")
-        return 0
-
-    total_in_batch = len(offers_to_send)
-    logger.info(f"Attempting to send batch of {total_in_batch} notifications (limit {batch_size})...")
+        return []
 
+    # Validate offer structure once, up front
+    valid_offers = []
     for i, offer in enumerate(offers_to_send):
-        # Validate offer structure
         if not isinstance(offer, dict) or not offer.get('id'):
-            logger.warning(f"Skipping invalid offer data at index {i} in batch.")
+            logger.warning("Skipping invalid offer data at index %s in batch.", i)
             continue
-
-        offer_id_str = offer.get('id')
-        logger.info(f"Sending notification {i+1}/{total_in_batch} for offer ID: {offer_id_str}")
-
-        if send_discord_notification(offer):
-            sent_count += 1
+        valid_offers.append(offer)
+
+    # Keep only offers whose skills have been retrieved, checked in one query
+    ready_ids = get_skills_retrieved_offer_ids([offer['id'] for offer in valid_offers])
+    ready_offers = []
+    for offer in valid_offers:
+        if offer['id'] in ready_ids:
+            ready_offers.append(offer)
         else:
-            logger.warning(f"Failed to send notification for offer ID {offer_id_str}.")
-
-        # Add delay between notifications (except after the last one)
-        if i < total_in_batch - 1 and delay_seconds > 0:
-            logger.debug(f"Waiting {delay_seconds}s before next notification...")
-            time.sleep(delay_seconds)
-
-    logger.info(f"Finished sending batch. Successfully sent {sent_count}/{total_in_batch} notifications.")
-    return sent_count
+            logger.warning("Skipping Discord notification for offer ID %s - not in database or skills not yet retrieved", offer['id'])
+    valid_offers = ready_offers
+
+    # Count only the offers that will actually be attempted
+    total_in_batch = len(valid_offers)
+    logger.info("Attempting to send batch of %s notifications (limit %s)...", total_in_batch, batch_size)
+
+    # Pre-fetch skills and languages for the whole batch in two queries instead of
+    # two queries per offer, so the sender threads below only do network I/O.
+    batch_ids = [offer['id'] for offer in valid_offers]
+    skills_by_offer = get_job_skills_from_db_bulk(batch_ids)
+    languages_by_offer = get_job_languages_from_db_bulk(batch_ids)
+    # One timestamp for the whole batch; Discord only displays it to the second.
+    batch_timestamp = datetime.now(timezone.utc).isoformat()
+
+    # Coalesce up to DISCORD_EMBEDS_PER_MESSAGE offers (Discord caps it at 10) into
+    # each webhook message.
+    per_message = max(1, min(_MAX_EMBEDS_PER_MESSAGE, int(CONFIG.get('DISCORD_EMBEDS_PER_MESSAGE', 1))))
+    groups = [valid_offers[i:i + per_message] for i in range(0, len(valid_offers), per_message)]
+
+    def send_group(indexed_group):
+        i, group = indexed_group
+        group_ids_str = ", ".join(str(offer['id']) for offer in group)
+        logger.info("Sending notification %s/%s for offer ID(s): %s", i+1, len(groups), group_ids_str)
+
+        sent_ids = _send_offers_message(
+            webhook_url,
+            group,
+            skills_by_offer=skills_by_offer,
+            languages_by_offer=languages_by_offer,
+            timestamp=batch_timestamp,
+        )
+        if len(sent_ids) < len(group):
+            logger.warning("Failed to send notification for %s offer(s) among ID(s) %s.", len(group) - len(sent_ids), group_ids_str)
+        return sent_ids
+
+    # Post messages concurrently; socket I/O releases the GIL, and the shared token
+    # bucket keeps the combined rate within Discord's limit.
+    if groups:
+        with ThreadPoolExecutor(max_workers=min(_MAX_PARALLEL_POSTS, len(groups))) as executor:
+            for group_sent_ids in executor.map(send_group, enumerate(groups)):
+                sent_ids.extend(group_sent_ids)
+
+    logger.info("Finished sending batch. Successfully sent %s/%s notifications.", len(sent_ids), total_in_batch)
+    return sent_ids
 # --- END OF FILE discord_notifier.py ---
\ No newline at end of file
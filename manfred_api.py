@@ -1,24 +1,82 @@
 # --- START OF FILE manfred_api.py ---
 import logging
-import json
 import httpx
 import time
 import os
+import random
 import re
+import socket
+import threading
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from pydantic import ValidationError
 
 from config import CONFIG  # Shared configuration
-from database import log_fetch_attempt  # Import DB function for logging
+from database import queue_fetch_attempt  # Background DB logging of requests
+from models import OfferDetailEnvelope
 
 logger = logging.getLogger(__name__)
 
 # Create a persistent httpx Client
+# HTTP/2 lets concurrent detail fetches multiplex over one connection to getmanfred.com;
+# TCP_NODELAY stops small request frames waiting on Nagle's algorithm
 http_client = httpx.Client(
-    timeout=15.0,
-    follow_redirects=True
+    transport=httpx.HTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+        socket_options=[(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)],
+    ),
+    timeout=httpx.Timeout(15.0, connect=5.0),
+    follow_redirects=True,
+    headers={"User-Agent": "manfred-job-fetcher/1.0"}
 )
 
-def make_api_request(url, method='GET', json_payload=None, timeout=15):
-    """Makes an HTTP request with retries and logs the attempt using the database logger."""
+# The Next.js build ID embedded in the main page, e.g. "buildId":"BIDHCAYe6i8X-XyfefcMo"
+_BUILD_ID_MARKER = '"buildId":"'
+_BUILD_ID_RE = re.compile(r'"buildId":"([a-zA-Z0-9_-]+)"')
+
+# A successful BUILD_ID_HASH refresh is reused for this long, so a burst of failing
+# detail fetches triggers one website hit rather than one each.
+BUILD_ID_HASH_REFRESH_INTERVAL = 60.0
+_hash_lock = threading.Lock()
+_hash_refreshed_at = 0.0
+
+# Validators of the last main page a buildId was read from, for conditional GETs
+_page_cache = {'etag': None, 'last_modified': None, 'hash': None}
+
+# Last offers list response: reused as-is within OFFERS_CACHE_TTL seconds, and
+# revalidated with a conditional GET after that. Only the immutable raw bytes are kept,
+# so no caller can change what the next one sees; request threads and the scheduler
+# share it, so reads and updates go through _offers_cache_lock
+_offers_cache = {'url': None, 'etag': None, 'last_modified': None, 'raw': None, 'fetched_at': 0.0}
+_offers_cache_lock = threading.Lock()
+
+def _retry_after_seconds(response, default):
+    """
+    Returns how long to wait before retrying a 429/503 response: the numeric
+    Retry-After header if it asks for longer than ``default``, else ``default``.
+    Capped at RETRY_MAX_SLEEP, so a server asking for an hour can't park a worker
+    thread (and the pipeline lock it holds) for that long.
+    """
+    try:
+        wait = max(default, float(response.headers['Retry-After']))
+    except (KeyError, TypeError, ValueError):
+        wait = default
+    return min(wait, CONFIG['RETRY_MAX_SLEEP'])
+
+def _backoff_seconds(backoff_factor, retries):
+    """
+    Full-jitter exponential backoff, so concurrent retries don't hit the origin in
+    lockstep, capped at RETRY_MAX_SLEEP seconds.
+    """
+    return random.uniform(0, min(backoff_factor * (2 ** retries), CONFIG['RETRY_MAX_SLEEP']))
+
+def make_api_request(url, method='GET', json_payload=None, timeout=15, headers=None):
+    """
+    Makes an HTTP request with retries and logs the attempt using the database logger.
+    Extra ``headers`` are sent with GET requests; a 304 Not Modified counts as success.
+    """
     response = None
     error = None
     status_code = None
@@ -33,31 +91,33 @@ def make_api_request(url, method='GET', json_payload=None, timeout=15):
     
     while retries <= max_retries:
         try:
-            logger.debug(f"Making {method} request to {url} (attempt {retries+1}/{max_retries+1})")
+            logger.debug("Making %s request to %s (attempt %s/%s)", method, url, retries+1, max_retries+1)
             
             if method.upper() == 'POST':
                 response = http_client.post(
                     url, 
-                    json=json_payload, 
+                    content=orjson.dumps(json_payload) if json_payload is not None else None, 
                     headers={"Content-Type": "application/json"}, 
                     timeout=timeout
                 )
             else:  # Default to GET
-                response = http_client.get(url, timeout=timeout)
+                response = http_client.get(url, headers=headers, timeout=timeout)
 
             status_code = response.status_code
             response_size = len(response.content)
             
             # Success - no need to retry
-            if 200 <= status_code < 300:
-                logger.debug(f"Request successful: {method} {url} -> {status_code}")
+            if 200 <= status_code < 300 or status_code == 304:
+                logger.debug("Request successful: %s %s -> %s", method, url, status_code)
                 return response
                 
             # Server errors or specific status codes that warrant a retry
             if status_code in [429, 500, 502, 503, 504] and retries < max_retries:
                 retries += 1
-                sleep_time = backoff_factor * (2 ** retries)
-                logger.warning(f"Request failed with status {status_code}. Retrying in {sleep_time:.2f}s ({retries}/{max_retries})")
+                sleep_time = _backoff_seconds(backoff_factor, retries)
+                if status_code in (429, 503):
+                    sleep_time = _retry_after_seconds(response, sleep_time)
+                logger.warning("Request failed with status %s. Retrying in %.2fs (%s/%s)", status_code, sleep_time, retries, max_retries)
                 time.sleep(sleep_time)
                 continue
                 
@@ -70,8 +130,8 @@ def make_api_request(url, method='GET', json_payload=None, timeout=15):
             
             if retries < max_retries:
                 retries += 1
-                sleep_time = backoff_factor * (2 ** retries)
-                logger.warning(f"Request timed out. Retrying in {sleep_time:.2f}s ({retries}/{max_retries})")
+                sleep_time = _backoff_seconds(backoff_factor, retries)
+                logger.warning("Request timed out. Retrying in %.2fs (%s/%s)", sleep_time, retries, max_retries)
                 time.sleep(sleep_time)
                 continue
             break
@@ -82,7 +142,7 @@ def make_api_request(url, method='GET', json_payload=None, timeout=15):
             if e.response is not None:
                 status_code = e.response.status_code
                 response_size = len(e.response.content) if e.response.content else 0
-                logger.error(f"{error} - Status: {status_code}, Response: {e.response.text[:200]}")
+                logger.error("%s - Status: %s, Response: %s", error, status_code, e.response.text[:200])
             else:
                 logger.error(error)
             break
@@ -95,8 +155,8 @@ def make_api_request(url, method='GET', json_payload=None, timeout=15):
             
             if retries < max_retries:
                 retries += 1
-                sleep_time = backoff_factor * (2 ** retries)
-                logger.warning(f"Request failed with error. Retrying in {sleep_time:.2f}s ({retries}/{max_retries})")
+                sleep_time = _backoff_seconds(backoff_factor, retries)
+                logger.warning("Request failed with error. Retrying in %.2fs (%s/%s)", sleep_time, retries, max_retries)
                 time.sleep(sleep_time)
                 continue
                 
@@ -105,25 +165,80 @@ def make_api_request(url, method='GET', json_payload=None, timeout=15):
             
         except Exception as e:
             error = f"Unexpected error during request to {url}: {e}"
-            logger.exception(f"Unexpected error during request to {url}")
+            logger.exception("Unexpected error during request to %s", url)
             break
     
     # Log the attempt regardless of success or failure
-    log_fetch_attempt(url, status_code, response_size, error)
+    queue_fetch_attempt(url, status_code, response_size, error)
     return None  # Return None if all retries failed
 
-def fetch_raw_offers_list():
-    """Fetches the list of raw job offers from the configured endpoint."""
+def _fetch_offers_content():
+    """
+    Returns the raw JSON bytes of the offers list from the configured endpoint, or
+    None on failure. Bytes fetched less than OFFERS_CACHE_TTL seconds ago are
+    returned without a request; after that they are revalidated with
+    ETag/Last-Modified, so an unchanged list costs a 304.
+    """
     endpoint_url = CONFIG['EXTERNAL_ENDPOINT_URL']
-    logger.info(f"Fetching raw offers list from {endpoint_url}")
-    response = make_api_request(endpoint_url)
-    if response:
-        try:
-            return response.json()  # Return parsed JSON
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to decode JSON from {endpoint_url}: {e}")
-            return None  # Indicate failure to parse
-    return None  # Indicate failure to fetch
+    with _offers_cache_lock:
+        cache = dict(_offers_cache)  # Consistent snapshot; the request runs unlocked
+    cached_raw = cache['raw'] if cache['url'] == endpoint_url else None
+
+    if cached_raw is not None and time.monotonic() - cache['fetched_at'] < CONFIG['OFFERS_CACHE_TTL']:
+        logger.info("Using offers list fetched %.0fs ago", time.monotonic() - cache['fetched_at'])
+        return cached_raw
+
+    headers = {}
+    if cached_raw is not None:
+        if cache['etag']:
+            headers['If-None-Match'] = cache['etag']
+        if cache['last_modified']:
+            headers['If-Modified-Since'] = cache['last_modified']
+
+    logger.info("Fetching raw offers list from %s", endpoint_url)
+    response = make_api_request(endpoint_url, headers=headers or None)
+    if not response:
+        return None  # Indicate failure to fetch
+    if response.status_code == 304 and cached_raw is not None:
+        logger.info("Offers list not modified since last fetch")
+        with _offers_cache_lock:
+            if _offers_cache['raw'] is cached_raw:
+                _offers_cache['fetched_at'] = time.monotonic()
+        return cached_raw
+
+    raw = response.content
+    # Cheap sanity check instead of a full parse: a JSON array or object
+    if raw.lstrip()[:1] not in (b'[', b'{'):
+        logger.error("Response from %s is not a JSON array or object", endpoint_url)
+        return None
+    with _offers_cache_lock:
+        _offers_cache.update(
+            url=endpoint_url,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            raw=raw,
+            fetched_at=time.monotonic(),
+        )
+    return raw
+
+def fetch_raw_offers_bytes():
+    """Returns the offers list as the upstream's raw JSON bytes (for passthrough), or None on failure."""
+    return _fetch_offers_content()
+
+def fetch_raw_offers_list():
+    """
+    Fetches the list of raw job offers from the configured endpoint.
+    Shares _fetch_offers_content's cache of the raw bytes; each call parses its own
+    list, so callers are free to modify it.
+    """
+    raw = _fetch_offers_content()
+    if raw is None:
+        return None
+    try:
+        return orjson.loads(raw)  # Parse raw bytes directly
+    except orjson.JSONDecodeError as e:
+        logger.error("Failed to decode JSON from %s: %s", CONFIG['EXTERNAL_ENDPOINT_URL'], e)
+        return None  # Indicate failure to parse
 
 def save_build_hash_to_file(build_hash):
     """
@@ -140,74 +255,160 @@ def save_build_hash_to_file(build_hash):
             os.makedirs(config_dir, exist_ok=True)
             config_file = os.path.join(config_dir, 'build_hash.json')
         
-        # Write the hash to the file
-        with open(config_file, 'w') as f:
-            json.dump({'BUILD_ID_HASH': build_hash}, f)
-        
         # Update CONFIG in memory
         CONFIG['BUILD_ID_HASH'] = build_hash
         
-        logger.info(f"Saved BUILD_ID_HASH to {config_file}: {build_hash}")
+        # Skip the disk write when the file already holds this hash
+        try:
+            with open(config_file, 'rb') as f:
+                if orjson.loads(f.read()).get('BUILD_ID_HASH') == build_hash:
+                    logger.debug("BUILD_ID_HASH in %s is already %s", config_file, build_hash)
+                    return True
+        except (OSError, ValueError, AttributeError):
+            pass  # Missing or unreadable file: (re)write it
+        
+        # Write to a temp file and rename over the original, so a crash mid-write
+        # never leaves a truncated file behind
+        tmp_file = f"{config_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(orjson.dumps({'BUILD_ID_HASH': build_hash}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, config_file)
+        
+        logger.info("Saved BUILD_ID_HASH to %s: %s", config_file, build_hash)
         return True
     except Exception as e:
-        logger.error(f"Failed to save BUILD_ID_HASH to file: {e}", exc_info=True)
+        logger.error("Failed to save BUILD_ID_HASH to file: %s", e, exc_info=True)
         return False
 
+def _extract_build_id(html_content):
+    """Returns the buildId found in the page HTML, or None."""
+    # Fast path: a literal find is much cheaper than a regex scan over the whole page
+    start = html_content.find(_BUILD_ID_MARKER)
+    if start >= 0:
+        start += len(_BUILD_ID_MARKER)
+        end = html_content.find('"', start)
+        candidate = html_content[start:end] if end > start else ""
+        if candidate and candidate.replace('_', '').replace('-', '').isalnum() and candidate.isascii():
+            return candidate
+    match = _BUILD_ID_RE.search(html_content)
+    return match.group(1) if match else None
+
+def _stream_build_id(url, chunk_size=16384):
+    """
+    Streams the page and returns its buildId as soon as it has been read, without
+    downloading and decoding the rest. While the current BUILD_ID_HASH came from
+    this page, the request is conditional and a 304 returns that hash unparsed.
+    Returns None if the request fails or no buildId is found.
+    """
+    headers = {}
+    if _page_cache['hash'] and _page_cache['hash'] == CONFIG.get('BUILD_ID_HASH'):
+        if _page_cache['etag']:
+            headers['If-None-Match'] = _page_cache['etag']
+        if _page_cache['last_modified']:
+            headers['If-Modified-Since'] = _page_cache['last_modified']
+
+    tail = ""
+    try:
+        with http_client.stream('GET', url, headers=headers or None) as response:
+            if response.status_code == 304 and headers:
+                logger.info("Main page not modified, BUILD_ID_HASH unchanged")
+                return _page_cache['hash']
+            if response.status_code != 200:
+                logger.warning("Streaming %s returned status %s", url, response.status_code)
+                return None
+            for chunk in response.iter_text(chunk_size=chunk_size):
+                buf = tail + chunk
+                start = buf.find(_BUILD_ID_MARKER)
+                if start >= 0 and buf.find('"', start + len(_BUILD_ID_MARKER)) >= 0:
+                    build_id = _extract_build_id(buf[start:])
+                    if build_id:
+                        _page_cache.update(etag=response.headers.get('ETag'),
+                                           last_modified=response.headers.get('Last-Modified'),
+                                           hash=build_id)
+                    return build_id
+                # Carry over just enough to catch a marker split across chunks
+                tail = buf[start:] if start >= 0 else buf[-64:]
+    except httpx.HTTPError as e:
+        logger.warning("Streaming %s for BUILD_ID_HASH failed: %s", url, e)
+    return None
+
 def fetch_and_update_build_id_hash():
     """
     Fetches the current BUILD_ID_HASH from the getmanfred.com website and updates CONFIG.
+    Concurrent callers share a single refresh, and one that succeeded less than
+    BUILD_ID_HASH_REFRESH_INTERVAL seconds ago is reused without another fetch.
     Returns True if successful, False otherwise.
     """
+    global _hash_refreshed_at
+    with _hash_lock:
+        # Another caller refreshed while we waited for the lock (or just before)
+        if (_hash_refreshed_at and CONFIG.get('BUILD_ID_HASH', '')
+                and time.monotonic() - _hash_refreshed_at < BUILD_ID_HASH_REFRESH_INTERVAL):
+            logger.debug("BUILD_ID_HASH was refreshed recently, reusing it")
+            return True
+        updated = _refresh_build_id_hash()
+        if updated:
+            _hash_refreshed_at = time.monotonic()
+        return updated
+
+def _refresh_build_id_hash():
+    """Does the actual BUILD_ID_HASH fetch/update for fetch_and_update_build_id_hash."""
     try:
         # Log current hash for debugging
         current_hash = CONFIG['BUILD_ID_HASH']
-        logger.info(f"Current BUILD_ID_HASH before update attempt: {current_hash}")
+        logger.info("Current BUILD_ID_HASH before update attempt: %s", current_hash)
         
         # Log config source and env var for complete debugging
         config_file = os.path.join(os.path.dirname(CONFIG['DB_PATH']), 'config', 'build_hash.json')
         env_hash = os.environ.get('BUILD_ID_HASH', 'NOT_SET')
         
-        logger.debug(f"BUILD_ID_HASH from environment: {env_hash}")
-        logger.debug(f"Config file path: {config_file}")
+        logger.debug("BUILD_ID_HASH from environment: %s", env_hash)
+        logger.debug("Config file path: %s", config_file)
         
-        if os.path.exists(config_file):
+        # Reading the file is only for debugging; skip the disk hit otherwise
+        if logger.isEnabledFor(logging.DEBUG):
             try:
-                with open(config_file, 'r') as f:
-                    import json
-                    json_data = json.load(f)
+                with open(config_file, 'rb') as f:
+                    json_data = orjson.loads(f.read())
                     json_hash = json_data.get('BUILD_ID_HASH', 'NOT_FOUND')
-                    logger.debug(f"BUILD_ID_HASH from json file: {json_hash}")
+                    logger.debug("BUILD_ID_HASH from json file: %s", json_hash)
+            except FileNotFoundError:
+                pass
             except Exception as e:
-                logger.warning(f"Could not read hash from config file: {e}")
+                logger.warning("Could not read hash from config file: %s", e)
         
         # Fetch the main page
         logger.info("Attempting to fetch new BUILD_ID_HASH from getmanfred.com")
         main_page_url = "https://www.getmanfred.com/es/ofertas-empleo"  # Updated URL based on redirects in logs
-        response = make_api_request(main_page_url)
-        
-        if not response:
-            logger.error("Failed to fetch main page to extract BUILD_ID_HASH")
-            return False
-        
-        html_content = response.text
+        # Stream the page and stop reading once the build ID has arrived
+        new_hash = _stream_build_id(main_page_url)
         
-        # Extract the build ID hash using a regular expression
-        # Looking for patterns like: "buildId":"BIDHCAYe6i8X-XyfefcMo"
-        pattern = r'"buildId":"([a-zA-Z0-9_-]+)"'
-        match = re.search(pattern, html_content)
-        
-        if not match:
-            logger.error("Could not find BUILD_ID_HASH in the main page content")
-            # Log a sample of the HTML to help debug
-            logger.debug(f"HTML sample: {html_content[:500]}")
-            return False
+        if not new_hash:
+            # Fall back to a full fetch with retries
+            response = make_api_request(main_page_url)
+            
+            if not response:
+                logger.error("Failed to fetch main page to extract BUILD_ID_HASH")
+                return False
+            
+            html_content = response.text
+            
+            # Extract the build ID hash
+            new_hash = _extract_build_id(html_content)
+            
+            if not new_hash:
+                logger.error("Could not find BUILD_ID_HASH in the main page content")
+                # Log a sample of the HTML to help debug
+                logger.debug("HTML sample: %s", html_content[:500])
+                return False
         
-        new_hash = match.group(1)
-        logger.info(f"Extracted hash from website: {new_hash}")
+        logger.info("Extracted hash from website: %s", new_hash)
         
         # Check if the hash is different from the current one
         if new_hash == CONFIG['BUILD_ID_HASH']:
-            logger.info(f"Current BUILD_ID_HASH is already up-to-date: {new_hash}")
+            logger.info("Current BUILD_ID_HASH is already up-to-date: %s", new_hash)
             return True
         
         # Update the CONFIG dictionary
@@ -222,114 +423,148 @@ def fetch_and_update_build_id_hash():
         # Also update the environment variable
         os.environ['BUILD_ID_HASH'] = new_hash
         
-        logger.info(f"Successfully updated BUILD_ID_HASH from {old_hash} to {new_hash}")
+        logger.info("Successfully updated BUILD_ID_HASH from %s to %s", old_hash, new_hash)
         return True
     
     except Exception as e:
-        logger.error(f"Error fetching and updating BUILD_ID_HASH: {e}", exc_info=True)
+        logger.error("Error fetching and updating BUILD_ID_HASH: %s", e, exc_info=True)
         return False
 
+_DEFAULT_DETAIL_URL_FORMAT = "https://www.getmanfred.com/_next/data/{build_hash}/es/job-offers/{offer_id}/{offer_slug}.json"
+
+@lru_cache(maxsize=4)
+def _detail_url_format(pattern):
+    """
+    Turns DETAIL_ENDPOINT_PATTERN into a single str.format template taking
+    build_hash, offer_id and offer_slug. Resolved once per pattern, so each detail
+    fetch is one format call.
+    """
+    # Handle different placeholder formats for backward compatibility
+    if "${BUILD_ID_HASH}" in pattern:
+        url_format = pattern.replace('${BUILD_ID_HASH}', '{build_hash}')
+    elif "${}" in pattern:
+        url_format = pattern.replace('${}', '{build_hash}')
+    else:
+        # Fallback to manually constructing the URL if pattern is unexpected
+        logger.warning("Could not find BUILD_ID_HASH placeholder in pattern: %s", pattern)
+        return _DEFAULT_DETAIL_URL_FORMAT
+
+    # Check the placeholders once here instead of on every request
+    try:
+        url_format.format(build_hash="", offer_id=0, offer_slug="")
+    except (KeyError, IndexError, ValueError) as e:
+        logger.error("Error in format placeholders: %s. Using direct URL construction.", e)
+        return _DEFAULT_DETAIL_URL_FORMAT
+    return url_format
+
+def _build_detail_url(offer_id, slug, build_hash):
+    """Returns the detail endpoint URL for an offer under the given build hash."""
+    return _detail_url_format(CONFIG['DETAIL_ENDPOINT_PATTERN']).format(
+        build_hash=build_hash, offer_id=offer_id, offer_slug=slug
+    )
+
+def _refreshed_build_id_hash(current_hash, reason):
+    """
+    Refreshes BUILD_ID_HASH after a failed detail fetch. Returns the new hash if it
+    changed (worth retrying), else None.
+    """
+    logger.warning("%s, attempting to update BUILD_ID_HASH and retry", reason)
+    if not fetch_and_update_build_id_hash():
+        logger.error("Failed to update BUILD_ID_HASH, cannot retry request")
+        return None
+    new_hash = CONFIG.get('BUILD_ID_HASH', '')
+    if new_hash == current_hash:
+        logger.info("BUILD_ID_HASH is unchanged, not retrying request")
+        return None
+    return new_hash
+
 def fetch_job_details_data(offer_id, slug, retry_on_hash_error=True):
-    """Fetches detailed information for a specific job offer."""
+    """
+    Fetches detailed information for a specific job offer.
+    With retry_on_hash_error, a failed request or an error-shaped response refreshes
+    BUILD_ID_HASH and, if it changed, tries once more with the new hash.
+    """
     if not slug:
-        logger.warning(f"Skipping job details fetch for offer ID {offer_id} due to missing slug.")
+        logger.warning("Skipping job details fetch for offer ID %s due to missing slug.", offer_id)
         return None
 
-    # Construct the detail endpoint URL by replacing placeholders
-    try:
-        # Get the current hash from CONFIG
-        current_hash = CONFIG.get('BUILD_ID_HASH', '')
-        
-        # If hash is empty, try to fetch it first
-        if not current_hash and retry_on_hash_error:
-            logger.warning("BUILD_ID_HASH is empty, fetching it before proceeding")
-            if fetch_and_update_build_id_hash():
-                current_hash = CONFIG.get('BUILD_ID_HASH', '')
-                if not current_hash:
-                    logger.error("Failed to get BUILD_ID_HASH even after update attempt")
-                    return None
-            else:
-                logger.error("Failed to fetch BUILD_ID_HASH, cannot proceed with job details request")
+    # Get the current hash from CONFIG
+    current_hash = CONFIG.get('BUILD_ID_HASH', '')
+    
+    # If hash is empty, try to fetch it first
+    if not current_hash and retry_on_hash_error:
+        logger.warning("BUILD_ID_HASH is empty, fetching it before proceeding")
+        if fetch_and_update_build_id_hash():
+            current_hash = CONFIG.get('BUILD_ID_HASH', '')
+            if not current_hash:
+                logger.error("Failed to get BUILD_ID_HASH even after update attempt")
                 return None
-        
-        logger.debug(f"Using BUILD_ID_HASH for request: {current_hash}")
-        
-        # Get the pattern and replace the placeholder
-        pattern = CONFIG['DETAIL_ENDPOINT_PATTERN']
-        logger.debug(f"Original pattern: {pattern}")
-        
-        # Handle different placeholder formats for backward compatibility
-        if "${BUILD_ID_HASH}" in pattern:
-            endpoint_url = pattern.replace('${BUILD_ID_HASH}', current_hash)
-        elif "${}" in pattern:
-            endpoint_url = pattern.replace('${}', current_hash)
         else:
-            # Fallback to manually constructing the URL if pattern is unexpected
-            logger.warning(f"Could not find BUILD_ID_HASH placeholder in pattern: {pattern}")
-            endpoint_url = f"https://www.getmanfred.com/_next/data/{current_hash}/es/job-offers/{offer_id}/{offer_slug}.json"
-        
-        logger.debug(f"Endpoint URL after hash replacement: {endpoint_url}")
-        
-        # Now handle the Python format placeholders
+            logger.error("Failed to fetch BUILD_ID_HASH, cannot proceed with job details request")
+            return None
+
+    attempts = 2 if retry_on_hash_error else 1
+    for attempt in range(attempts):
+        can_retry = attempt + 1 < attempts
+        endpoint_url = _build_detail_url(offer_id, slug, current_hash)
+        logger.info("Fetching job details for offer ID %s from %s", offer_id, endpoint_url)
+        response = make_api_request(endpoint_url)
+
+        # The request failing might be due to an invalid hash
+        if not response:
+            new_hash = can_retry and _refreshed_build_id_hash(current_hash, "Failed to fetch job details")
+            if new_hash:
+                current_hash = new_hash
+                continue
+            logger.error("Failed to fetch job details for offer ID %s (request failed).", offer_id)
+            return None
+
         try:
-            endpoint_url = endpoint_url.format(
-                offer_id=offer_id,
-                offer_slug=slug
-            )
-        except KeyError as e:
-            logger.error(f"Error in format placeholders: {e}. Using direct URL construction.")
-            endpoint_url = f"https://www.getmanfred.com/_next/data/{current_hash}/es/job-offers/{offer_id}/{slug}.json"
-        
-        logger.info(f"Final endpoint URL: {endpoint_url}")
-        
-    except Exception as e:
-        logger.error(f"Error constructing URL: {e}", exc_info=True)
-        # Fallback to a simple construction method
-        current_hash = CONFIG.get('BUILD_ID_HASH', '')
-        endpoint_url = f"https://www.getmanfred.com/_next/data/{current_hash}/es/job-offers/{offer_id}/{slug}.json"
-        logger.info(f"Using fallback URL: {endpoint_url}")
-
-    logger.info(f"Fetching job details for offer ID {offer_id} from {endpoint_url}")
-    response = make_api_request(endpoint_url)
-
-    # Check if the request failed and it might be due to an invalid hash
-    if not response and retry_on_hash_error:
-        # Try to update the hash and retry
-        logger.warning(f"Failed to fetch job details, attempting to update BUILD_ID_HASH and retry")
-        if fetch_and_update_build_id_hash():
-            # Retry the request with the new hash (disable retry_on_hash_error to avoid infinite recursion)
-            return fetch_job_details_data(offer_id, slug, retry_on_hash_error=False)
-        else:
-            logger.error(f"Failed to update BUILD_ID_HASH, cannot retry request")
-    
-    if not response:
-        logger.error(f"Failed to fetch job details for offer ID {offer_id} (request failed).")
-        return None
+            # Parse and validate straight from the response bytes
+            envelope = OfferDetailEnvelope.model_validate_json(response.content)
+            offer_details = envelope.pageProps.offer if envelope.pageProps else None
+            if offer_details:
+                logger.info("Successfully fetched and parsed details for offer ID %s.", offer_id)
+                return offer_details
 
-    try:
-        data = response.json()
-        # Navigate the expected structure to find the offer details
-        offer_details = data.get('pageProps', {}).get('offer')
-        if offer_details and isinstance(offer_details, dict):
-            logger.info(f"Successfully fetched and parsed details for offer ID {offer_id}.")
-            return offer_details
-        else:
-            logger.warning(f"Could not find 'pageProps.offer' in the response for job details, offer ID {offer_id}. Response keys: {list(data.keys())}")
-            # Check if this might be due to an invalid hash (e.g., the response structure is completely different)
-            if retry_on_hash_error and ('error' in data or 'notFound' in data):
-                logger.warning(f"Response indicates possible invalid hash, attempting to update BUILD_ID_HASH and retry")
-                if fetch_and_update_build_id_hash():
-                    # Retry the request with the new hash
-                    return fetch_job_details_data(offer_id, slug, retry_on_hash_error=False)
-                else:
-                    logger.error(f"Failed to update BUILD_ID_HASH, cannot retry request")
+            extra_keys = envelope.model_extra or {}
+            logger.warning("Could not find 'pageProps.offer' in the response for job details, offer ID %s. Response keys: %s",
+                           offer_id, sorted(envelope.model_fields_set | extra_keys.keys()))
+            # A completely different structure might also mean an invalid hash
+            if can_retry and ('error' in extra_keys or 'notFound' in extra_keys):
+                new_hash = _refreshed_build_id_hash(current_hash, "Response indicates possible invalid hash")
+                if new_hash:
+                    current_hash = new_hash
+                    continue
             return None  # Structure mismatch
-    except json.JSONDecodeError as e:
-        logger.error(f"Error parsing JSON job details for offer ID {offer_id}: {e}")
-        return None
-    except Exception as e:
-        logger.error(f"Unexpected error processing job details response for offer ID {offer_id}: {e}", exc_info=True)
-        return None
+        except ValidationError as e:
+            logger.error("Error parsing JSON job details for offer ID %s: %s", offer_id, e.errors(include_url=False)[:1])
+            return None
+        except Exception as e:
+            logger.error("Unexpected error processing job details response for offer ID %s: %s", offer_id, e, exc_info=True)
+            return None
+
+    return None
+
+def fetch_all_job_details(offers):
+    """
+    Fetches details for several offers concurrently on a small thread pool.
+    ``offers`` are dicts with 'offer_id' and 'slug'; returns the details (or None
+    on failure) in the same order.
+    """
+    if not offers:
+        return []
+
+    # Resolve a missing hash once up front rather than from every worker thread
+    if not CONFIG.get('BUILD_ID_HASH', ''):
+        fetch_and_update_build_id_hash()
+
+    def fetch(offer):
+        return fetch_job_details_data(offer['offer_id'], offer['slug'])
+
+    # DETAIL_FETCH_WORKERS bounds concurrent detail requests
+    with ThreadPoolExecutor(max_workers=max(1, min(CONFIG['DETAIL_FETCH_WORKERS'], len(offers)))) as executor:
+        return list(executor.map(fetch, offers))
 
 def close_http_client():
     """Closes the HTTP client to free resources. Should be called during application shutdown."""
@@ -337,35 +572,37 @@ def close_http_client():
         http_client.close()
         logger.info("HTTP client closed successfully")
     except Exception as e:
-        logger.error(f"Error closing HTTP client: {e}")
+        logger.error("Error closing HTTP client: %s", e)
 
 # Function to help with retries for other modules
 def get_retry_for_request(func):
     """
     A helper function that can be used to add retry logic to any request function.
+    Only transport errors and HTTP status errors are retried, with the same
+    full-jitter backoff as make_api_request; anything else is raised immediately.
     Usage:
     
     @get_retry_for_request
     def my_request_function(url):
-        return requests.get(url)
+        return http_client.get(url)
     """
+    @wraps(func)
     def wrapper(*args, **kwargs):
         max_retries = CONFIG['MAX_RETRIES']
         backoff_factor = CONFIG['RETRY_BACKOFF']
+        attempt = 0
         
-        for attempt in range(max_retries + 1):
+        while True:
             try:
                 return func(*args, **kwargs)
-            except Exception as e:
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
                 if attempt >= max_retries:
                     raise
-                
-                sleep_time = backoff_factor * (2 ** attempt)
-                logger.warning(f"Request failed with {e}. Retrying in {sleep_time:.2f}s. "
-                              f"Attempt {attempt+1}/{max_retries+1}")
+                attempt += 1
+                sleep_time = _backoff_seconds(backoff_factor, attempt)
+                logger.warning("Request failed with %s. Retrying in %.2fs. Attempt %s/%s",
+                               e, sleep_time, attempt, max_retries)
                 time.sleep(sleep_time)
-        
-        return None  # This should never be reached
     
     return wrapper
 
@@ -1,33 +1,53 @@
 # --- START OF FILE models.py ---
 from typing import List, Optional, Dict, Any, Union
-from pydantic import BaseModel, Field, RootModel
+from pydantic import BaseModel, ConfigDict, Field, RootModel
 from datetime import datetime
 
+# Immutable value objects; unknown fields are dropped rather than stored
+_FROZEN = ConfigDict(frozen=True, extra='ignore')
+
 # Request Models (if needed)
 class ProcessLimitRequest(BaseModel):
-    limit: int = Field(10, description="Maximum number of offers to process")
+    model_config = _FROZEN
+    # Bounded so a bad request is rejected with 422 before any DB/upstream work
+    limit: int = Field(10, ge=1, le=100, description="Maximum number of offers to process")
 
 # Response Models
 class ErrorResponse(BaseModel):
+    model_config = _FROZEN
     status: str = "error"
     message: str
 
 class SkillDetail(BaseModel):
+    model_config = _FROZEN
     skill: str
     icon: Optional[str] = None
     level: Optional[int] = None
     desc: Optional[str] = None
 
 class LanguageDetail(BaseModel):
+    model_config = _FROZEN
     name: str
     level: str
 
 class JobSkillsResponse(BaseModel):
+    model_config = _FROZEN
     status: str = "success"
     offer_id: int
     skills: Dict[str, List[SkillDetail]]
     languages: List[LanguageDetail]
 
+# Upstream payloads
+class OfferDetailEnvelope(BaseModel):
+    """Next.js data response for an offer page; only pageProps.offer is used."""
+    class PageProps(BaseModel):
+        offer: Optional[Dict[str, Any]] = None
+
+    # Keep unknown top-level keys (e.g. 'error', 'notFound') in model_extra
+    model_config = ConfigDict(extra='allow')
+
+    pageProps: Optional[PageProps] = None
+
 # Define a root model for list responses
 # Use this for /raw-offers endpoint
 OffersList = RootModel[List[Dict[str, Any]]]
@@ -1,10 +1,14 @@
 # --- START OF FILE routes.py ---
+import hashlib
 import logging
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
-from fastapi import APIRouter, HTTPException, Depends, Query, Path, status, Body
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Query, Path, status, Body, BackgroundTasks, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
 from pydantic import BaseModel
 
 import services
@@ -17,97 +21,155 @@ from models import (
 
 logger = logging.getLogger(__name__)
 
-# Create a router instead of a Blueprint
-router = APIRouter()
+
+class OrjsonResponse(JSONResponse):
+    """JSONResponse rendered with orjson, for routes that build their response explicitly.
+
+    Routes returning data through response_model are already serialized by pydantic-core;
+    FastAPI's own ORJSONResponse is deprecated for that reason.
+    """
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+class _ErrorHandlingRoute(APIRoute):
+    """Maps errors escaping a handler to responses in one place, so handlers stay straight-line.
+
+    HTTPException and request validation errors pass through to FastAPI. ServiceBusyError
+    becomes a 409, and anything else is logged once and becomes a generic 500.
+    """
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            try:
+                return await handler(request)
+            except (HTTPException, RequestValidationError):
+                raise
+            except services.ServiceBusyError as e:
+                return OrjsonResponse(content={"detail": str(e)}, status_code=status.HTTP_409_CONFLICT)
+            except Exception:
+                logger.exception(f"Route: Unexpected error in {request.method} {request.url.path}")
+                return OrjsonResponse(
+                    content={"detail": "An internal server error occurred"},
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+
+        return route_handler
+
+
+# API router, included by app.py
+router = APIRouter(route_class=_ErrorHandlingRoute)
+
+
+def _accept_pipeline_task(background_tasks, service, message, **kwargs):
+    """Schedule a pipeline service (store/process/notify) to run after the response; 409 if one is already running."""
+    if services.pipeline_busy():
+        raise services.ServiceBusyError(f"{service.__name__} cannot start while the offers pipeline is running")
+    background_tasks.add_task(services.run_in_background, service, **kwargs)
+    return OrjsonResponse(
+        content={
+            "status": "accepted",
+            "message": message,
+            "timestamp": datetime.now().isoformat()
+        },
+        status_code=status.HTTP_202_ACCEPTED
+    )
 
 
 @router.get("/raw-offers", 
-    response_model=OffersList,
+    responses={200: {"model": OffersList}},  # Documentation only: the bytes are passed through
     summary="Get raw job offers list from Manfred API",
-    description="Directly fetches and returns the JSON response from the configured EXTERNAL_ENDPOINT_URL without processing or saving.",
+    description="Returns the JSON response from the configured EXTERNAL_ENDPOINT_URL without processing or saving it. Without limit/offset the upstream bytes are passed through as-is; with them, only that page of offers is returned. Responses carry an ETag and honour If-None-Match.",
     response_description="Raw list of active job offers from the external API.",
     tags=["Raw Data"])
-def get_raw_offers():
+def get_raw_offers(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Return at most this many offers (default: all)"),
+    offset: int = Query(0, ge=0, description="Number of offers to skip")
+):
     logger.info("Route: GET /raw-offers")
-    try:
-        # Use the API function directly for raw data
-        data = manfred_api.fetch_raw_offers_list()
-        if data is not None:
-            # Check if it's a list (as expected) or handle other valid JSON types if needed
-            if isinstance(data, (list, dict)):
-                return data
-            else:
-                logger.error(f"Raw offers: Unexpected data type returned: {type(data)}")
-                raise HTTPException(
-                    status_code=status.HTTP_502_BAD_GATEWAY,
-                    detail="Unexpected data type received from external API"
-                )
-        else:
-            # fetch_raw_offers_list already logged the error
+    if limit is None and offset == 0:
+        # Pass the upstream JSON through untouched: no parse here, no re-serialization
+        raw = manfred_api.fetch_raw_offers_bytes()
+    else:
+        offers = manfred_api.fetch_raw_offers_list()
+        if offers is not None and not isinstance(offers, list):
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to fetch data from external API"
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Unexpected data type received from external API"
             )
-    except Exception as e:
-        logger.exception("Route: Unexpected error in /raw-offers")
+        raw = None if offers is None else orjson.dumps(
+            offers[offset:] if limit is None else offers[offset:offset + limit]
+        )
+    if raw is None:
+        # manfred_api already logged the error
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An internal server error occurred"
+            detail="Failed to fetch data from external API"
         )
+    # The list is served from manfred_api's cache for this long anyway
+    headers = {
+        "Cache-Control": f"public, max-age={int(services.CONFIG['OFFERS_CACHE_TTL'])}",
+        "ETag": f'"{hashlib.blake2b(raw, digest_size=8).hexdigest()}"',
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=raw, media_type="application/json", headers=headers)
 
 
 @router.post("/store-offers", 
-    response_model=StoreOffersResponse,
+    responses={200: {"model": StoreOffersResponse}},  # Documentation only: built by the service
     summary="Fetch, store/update job offers, process skills, notify",
-    description="Orchestrates fetching offers, storing new/updating existing ones, attempting to fetch skills for new offers, and sending Discord notifications for new offers.",
+    description="Orchestrates fetching offers, storing new/updating existing ones, attempting to fetch skills for new offers, and sending Discord notifications for new offers. With background=true the work runs after the response is sent and the endpoint returns 202 immediately.",
     response_description="Summary of actions performed.",
     tags=["Data Storage & Processing"])
-def store_offers_route():
+def store_offers_route(
+    background_tasks: BackgroundTasks,
+    background: bool = Query(False, description="Run the workflow out-of-band and return 202 immediately")
+):
     logger.info("Route: POST /store-offers")
-    try:
-        result = services.fetch_and_store_offers_service()
-        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR if result.get("status") == "error" else status.HTTP_200_OK
+    if background:
+        return _accept_pipeline_task(background_tasks, services.fetch_and_store_offers_service,
+                                     "Fetching and storing offers in the background")
+
+    result = services.fetch_and_store_offers_service()
+    status_code = status.HTTP_500_INTERNAL_SERVER_ERROR if result.get("status") == "error" else status.HTTP_200_OK
+    
+    # Handle specific upstream errors resulting in 502
+    if "Invalid response format" in result.get("message", "") or \
+       "Failed to fetch data" in result.get("message", ""):
+        return OrjsonResponse(content=result, status_code=status.HTTP_502_BAD_GATEWAY)
         
-        # Handle specific upstream errors resulting in 502
-        if "Invalid response format" in result.get("message", "") or \
-           "Failed to fetch data" in result.get("message", ""):
-            return JSONResponse(content=result, status_code=status.HTTP_502_BAD_GATEWAY)
-            
-        return JSONResponse(content=result, status_code=status_code)
-    except Exception as e:
-        logger.exception("Route: Unexpected error in /store-offers")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An internal server error occurred"
-        )
+    return OrjsonResponse(content=result, status_code=status_code)
 
 
 @router.post("/process-job-details", 
     response_model=ProcessDetailsResponse,
     summary="Process job offers to fetch and store detailed skills information",
-    description="Finds job offers marked as needing skills details, fetches their data from the Manfred API, stores the extracted skills, and marks the offer as processed.",
+    description="Finds job offers marked as needing skills details, fetches their data from the Manfred API, stores the extracted skills, and marks the offer as processed. With background=true the work runs after the response is sent and the endpoint returns 202 immediately.",
     response_description="Information about the processing batch.",
     tags=["Data Processing"])
-def process_job_details_route(request: ProcessLimitRequest = Body(default=ProcessLimitRequest())):
+def process_job_details_route(
+    background_tasks: BackgroundTasks,
+    request: ProcessLimitRequest = Body(default=ProcessLimitRequest()),
+    background: bool = Query(False, description="Process details out-of-band and return 202 immediately")
+):
     logger.info("Route: POST /process-job-details")
-    try:
-        limit = request.limit
-        if limit <= 0:
-            limit = 10  # Enforce a positive limit
+    limit = request.limit  # 1..100, validated by ProcessLimitRequest
 
-        processed_count = services.process_pending_details_service(limit=limit)
-        
-        return {
-            "status": "success",
-            "processed_count": processed_count,
-            "timestamp": datetime.now().isoformat()
-        }
-    except Exception as e:
-        logger.exception("Route: Unexpected error in /process-job-details")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"An internal server error occurred: {str(e)}"
-        )
+    if background:
+        return _accept_pipeline_task(background_tasks, services.process_pending_details_service,
+                                     f"Processing up to {limit} pending job details in the background",
+                                     limit=limit)
+
+    processed_count = services.process_pending_details_service(limit=limit)
+    
+    return {
+        "status": "success",
+        "processed_count": processed_count,
+        "timestamp": datetime.now().isoformat()
+    }
 
 
 @router.get("/job-skills/{offer_id}", 
@@ -118,63 +180,54 @@ def process_job_details_route(request: ProcessLimitRequest = Body(default=Proces
     tags=["Data Retrieval"])
 def get_job_skills_route(offer_id: int = Path(..., description="The unique ID of the job offer")):
     logger.info(f"Route: GET /job-skills/{offer_id}")
-    try:
-        result = services.get_job_skills_service(offer_id)
-        if result is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Job offer not found"
-            )
-        else:
-            return {
-                "status": "success",
-                "offer_id": offer_id,
-                "skills": result['skills'],
-                "languages": result['languages']
-            }
-    except HTTPException:
-        raise  # Re-raise HTTPExceptions
-    except Exception as e:
-        logger.exception(f"Route: Unexpected error in /job-skills/{offer_id}")
+    result = services.get_job_skills_service(offer_id)
+    if result is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An internal server error occurred"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job offer not found"
         )
+    else:
+        return {
+            "status": "success",
+            "offer_id": offer_id,
+            "skills": result['skills'],
+            "languages": result['languages']
+        }
 
 
 @router.post("/send-notifications", 
     response_model=NotificationsResponse,
     summary="Send Discord notifications for pending job offers",
-    description="Checks the database for job offers where 'notification_sent' is false, attempts to send them to the configured Discord webhook, and updates their status in the database.",
+    description="Checks the database for job offers where 'notification_sent' is false, attempts to send them to the configured Discord webhook, and updates their status in the database. With background=true the dispatch runs after the response is sent and the endpoint returns 202 immediately. Returns 409 while the offers pipeline (including another notification pass) is running.",
     response_description="Information about notifications sent.",
     tags=["Notifications"])
-def send_pending_notifications_route(request: ProcessLimitRequest = Body(default=ProcessLimitRequest(limit=5))):
+def send_pending_notifications_route(
+    background_tasks: BackgroundTasks,
+    request: ProcessLimitRequest = Body(default=ProcessLimitRequest(limit=5)),
+    background: bool = Query(False, description="Dispatch notifications out-of-band and return 202 immediately")
+):
     logger.info("Route: POST /send-notifications")
-    if not services.CONFIG['DISCORD_WEBHOOK_URL']:
+    if not services.CONFIG.get('DISCORD_WEBHOOK_URL'):
         logger.warning("Route: /send-notifications called but DISCORD_WEBHOOK_URL is not set.")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Discord webhook URL not configured"
         )
 
-    try:
-        limit = request.limit
-        if limit <= 0:
-            limit = 5  # Enforce a positive limit
+    limit = request.limit  # 1..100, validated by ProcessLimitRequest
 
-        offers_sent, remaining_pending = services.send_pending_notifications_service(limit=limit)
-        
-        return {
-            "status": "success",
-            "offers_sent": offers_sent,
-            "remaining_pending": remaining_pending
-        }
-    except Exception as e:
-        logger.exception("Route: Unexpected error in /send-notifications")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An internal server error occurred"
-        )
+    if background:
+        return _accept_pipeline_task(background_tasks, services.send_pending_notifications_service,
+                                     f"Sending up to {limit} pending notifications in the background",
+                                     limit=limit)
+
+    offers_sent, remaining_pending = services.send_pending_notifications_service(limit=limit)
+    
+    return {
+        "status": "success",
+        "offers_sent": offers_sent,
+        "remaining_pending": remaining_pending
+    }
 
 
 @router.put("/update-build-hash", 
@@ -184,39 +237,29 @@ def send_pending_notifications_route(request: ProcessLimitRequest = Body(default
     tags=["System"])
 def update_build_hash_route():
     logger.info("Route: PUT /update-build-hash")
-    try:
-        # Import the function from manfred_api
-        from manfred_api import fetch_and_update_build_id_hash
-        
-        # Store the original hash for comparison
-        original_hash = services.CONFIG['BUILD_ID_HASH']
-        
-        # Attempt to update the hash
-        success = fetch_and_update_build_id_hash()
-        
-        if success:
-            if original_hash != services.CONFIG['BUILD_ID_HASH']:
-                return {
-                    "status": "success",
-                    "message": f"Successfully updated BUILD_ID_HASH from {original_hash} to {services.CONFIG['BUILD_ID_HASH']}",
-                    "current_hash": services.CONFIG['BUILD_ID_HASH']
-                }
-            else:
-                return {
-                    "status": "success",
-                    "message": f"BUILD_ID_HASH is already up-to-date: {services.CONFIG['BUILD_ID_HASH']}",
-                    "current_hash": services.CONFIG['BUILD_ID_HASH']
-                }
+    # Store the original hash for comparison
+    original_hash = services.CONFIG['BUILD_ID_HASH']
+    
+    # Attempt to update the hash
+    success = manfred_api.fetch_and_update_build_id_hash()
+    
+    if success:
+        if original_hash != services.CONFIG['BUILD_ID_HASH']:
+            return {
+                "status": "success",
+                "message": f"Successfully updated BUILD_ID_HASH from {original_hash} to {services.CONFIG['BUILD_ID_HASH']}",
+                "current_hash": services.CONFIG['BUILD_ID_HASH']
+            }
         else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to update BUILD_ID_HASH"
-            )
-    except Exception as e:
-        logger.exception("Route: Unexpected error in /update-build-hash")
+            return {
+                "status": "success",
+                "message": f"BUILD_ID_HASH is already up-to-date: {services.CONFIG['BUILD_ID_HASH']}",
+                "current_hash": services.CONFIG['BUILD_ID_HASH']
+            }
+    else:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"An internal server error occurred: {str(e)}"
+            detail="Failed to update BUILD_ID_HASH"
         )
 
 
@@ -231,12 +274,16 @@ def health_check_route():
     try:
         health_status_data, is_healthy = services.get_health_status_service()
         status_code = status.HTTP_200_OK if is_healthy else status.HTTP_503_SERVICE_UNAVAILABLE
-        return JSONResponse(content=health_status_data, status_code=status_code)
+        return OrjsonResponse(
+            content=health_status_data,
+            status_code=status_code,
+            headers={"Cache-Control": f"max-age={int(services.HEALTH_CHECK_TTL)}"},
+        )
     except Exception as e:
         # This endpoint should be robust; only fail on truly unexpected errors
         logger.exception("Route: Unexpected error during health check")
         # Return an unhealthy status if the check itself fails critically
-        return JSONResponse(
+        return OrjsonResponse(
             content={
                 "status": "unhealthy",
                 "timestamp": datetime.now().isoformat(),
@@ -248,6 +295,15 @@ def health_check_route():
         )
 
 
+@router.get("/health/live",
+    summary="Liveness probe",
+    description="Answers from memory without touching the database; use it for liveness probes and /health for readiness.",
+    response_description="The process is up.",
+    tags=["System"])
+def liveness_route():
+    return {"status": "ok"}
+
+
 @router.delete("/cleanup-notifications", 
     summary="Clean up obsolete job notifications",
     description="Deletes Discord messages for job offers that are no longer active.",
@@ -255,25 +311,18 @@ def health_check_route():
     tags=["Notifications"])
 def cleanup_notifications_route():
     logger.info("Route: DELETE /cleanup-notifications")
-    if not services.CONFIG['DISCORD_WEBHOOK_URL']:
+    if not services.CONFIG.get('DISCORD_WEBHOOK_URL'):
         logger.warning("Route: /cleanup-notifications called but DISCORD_WEBHOOK_URL is not set.")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Discord webhook URL not configured"
         )
         
-    try:
-        deleted_count = services.cleanup_obsolete_job_notifications_service()
-        
-        return {
-            "status": "success",
-            "deleted_count": deleted_count,
-            "timestamp": datetime.now().isoformat()
-        }
-    except Exception as e:
-        logger.exception("Route: Unexpected error in /cleanup-notifications")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="An internal server error occurred"
-        )
+    deleted_count = services.cleanup_obsolete_job_notifications_service()
+    
+    return {
+        "status": "success",
+        "deleted_count": deleted_count,
+        "timestamp": datetime.now().isoformat()
+    }
 # --- END OF FILE routes.py ---
\ No newline at end of file
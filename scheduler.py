@@ -1,5 +1,6 @@
 # --- scheduler.py ---
 import logging
+import time
 from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
@@ -41,7 +42,10 @@ def initialize_scheduler(app: FastAPI):
         trigger=IntervalTrigger(seconds=fetch_interval),
         id='fetch_job_offers',
         name='Fetch and process Manfred job offers',
-        replace_existing=True
+        replace_existing=True,
+        # First run fires right after start() on the scheduler's own thread,
+        # so app startup isn't blocked on a full fetch.
+        next_run_time=datetime.now()
     )
     
     # Add job to clean up obsolete notifications - runs once per day
@@ -55,18 +59,15 @@ def initialize_scheduler(app: FastAPI):
     
     # Start the scheduler
     scheduler.start()
-    
-    # Run the job immediately at startup
-    logger.info("Running initial job fetch on startup")
-    scheduled_fetch_job()
+    logger.info("Initial job fetch scheduled to run in the background")
     
     logger.info("Scheduler successfully initialized and started")
     return scheduler
 
 def scheduled_fetch_job():
     """Function to be executed by the scheduler."""
-    start_time = datetime.now()
-    logger.info(f"Scheduler: Starting scheduled job fetch at {start_time.isoformat()}")
+    t0 = time.perf_counter()
+    logger.info(f"Scheduler: Starting scheduled job fetch at {datetime.now().isoformat()}")
     
     try:
         # Lazy import services
@@ -78,37 +79,49 @@ def scheduled_fetch_job():
         # 2. Store/update them in the database
         # 3. Process skills for new offers
         # 4. Send notifications for offers with skills
-        result = services.fetch_and_store_offers_service()
-        
-        # Log the result
-        status = result.get('status', 'unknown')
-        new_offers = result.get('new_offers', 0)
-        updated_offers = result.get('updated_offers', 0)
-        skills_processed = result.get('skills_processed', 0)
-        webhook_sent = result.get('webhook_sent', 0)
-        
-        end_time = datetime.now()
-        duration = (end_time - start_time).total_seconds()
-        
-        logger.info(
-            f"Scheduler: Completed scheduled job fetch in {duration:.2f} seconds. "
-            f"Status: {status}, New: {new_offers}, Updated: {updated_offers}, "
-            f"Skills processed: {skills_processed}, Notifications sent: {webhook_sent}"
-        )
+        # Each step is single-flight; a busy step is skipped on its own, with the
+        # following passes still attempted.
+        try:
+            result = services.fetch_and_store_offers_service()
+        except services.ServiceBusyError as e:
+            logger.warning(f"Scheduler: Skipping scheduled job fetch: {e}")
+        else:
+            # Log the result
+            status = result.get('status', 'unknown')
+            new_offers = result.get('new_offers', 0)
+            updated_offers = result.get('updated_offers', 0)
+            skills_processed = result.get('skills_processed', 0)
+            webhook_sent = result.get('webhook_sent', 0)
+            
+            duration = time.perf_counter() - t0
+            
+            logger.info(
+                f"Scheduler: Completed scheduled job fetch in {duration:.2f} seconds. "
+                f"Status: {status}, New: {new_offers}, Updated: {updated_offers}, "
+                f"Skills processed: {skills_processed}, Notifications sent: {webhook_sent}"
+            )
         
         # Check for any pending notifications that might have failed previously
         if CONFIG.get('DISCORD_WEBHOOK_URL'):
             logger.info(f"Scheduler: Checking for any pending notifications...")
-            notification_result = services.send_pending_notifications_service(limit=10)
-            if notification_result[0] > 0:
-                logger.info(f"Scheduler: Sent {notification_result[0]} pending notifications, {notification_result[1]} remaining")
+            try:
+                notification_result = services.send_pending_notifications_service(limit=10)
+            except services.ServiceBusyError as e:
+                logger.warning(f"Scheduler: Skipping pending notifications pass: {e}")
             else:
-                logger.info(f"Scheduler: No pending notifications to send")
+                if notification_result[0] > 0:
+                    logger.info(f"Scheduler: Sent {notification_result[0]} pending notifications, {notification_result[1]} remaining")
+                else:
+                    logger.info(f"Scheduler: No pending notifications to send")
                 
         # Check for any offers still missing skills data
-        pending_skills_count = services.process_pending_details_service(limit=10)
-        if pending_skills_count > 0:
-            logger.info(f"Scheduler: Processed skills for {pending_skills_count} offers that were pending")
+        try:
+            pending_skills_count = services.process_pending_details_service(limit=10)
+        except services.ServiceBusyError as e:
+            logger.warning(f"Scheduler: Skipping pending job details pass: {e}")
+        else:
+            if pending_skills_count > 0:
+                logger.info(f"Scheduler: Processed skills for {pending_skills_count} offers that were pending")
     
     except Exception as e:
         logger.error(f"Scheduler: Error during scheduled job fetch: {e}", exc_info=True)
@@ -122,9 +135,12 @@ def cleanup_obsolete_notifications_job():
         services = get_services()
         
         # Call the service function to clean up obsolete notifications
-        deleted_count = services.cleanup_obsolete_job_notifications_service()
-        
-        logger.info(f"Scheduler: Completed obsolete notifications cleanup. Deleted {deleted_count} messages.")
+        try:
+            deleted_count = services.cleanup_obsolete_job_notifications_service()
+        except services.ServiceBusyError as e:
+            logger.warning(f"Scheduler: Skipping obsolete notifications cleanup: {e}")
+        else:
+            logger.info(f"Scheduler: Completed obsolete notifications cleanup. Deleted {deleted_count} messages.")
     
     except Exception as e:
         logger.error(f"Scheduler: Error during obsolete notifications cleanup: {e}", exc_info=True)
@@ -1,6 +1,13 @@
 # --- START OF FILE services.py ---
+import copy
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+from functools import wraps
+
+import orjson
 
 from config import CONFIG
 import database
@@ -10,6 +17,67 @@ import relevance
 
 logger = logging.getLogger(__name__)
 
+# Seconds a database connectivity check is reused by /health, so bursts of probes
+# cost one SELECT 1
+HEALTH_CHECK_TTL = 5.0
+_db_check_lock = threading.Lock()
+_db_check = {'at': 0.0, 'result': None}
+_HEALTH_CONFIG_KEYS = (
+    'EXTERNAL_ENDPOINT_URL',
+    'MAX_RETRIES',
+    'RETRY_BACKOFF',
+    'BUILD_ID_HASH',  # Important for details fetching
+)
+
+
+# Skills/languages results kept by get_job_skills_service. Only offers whose skills have
+# been retrieved are cached, on the assumption that they are not rewritten afterwards:
+# the pipeline only fetches details for offers still pending. A later direct write
+# (store_job_skills/store_job_languages) is not seen until the entry is evicted, and
+# each worker process has its own cache. Callers get copies, so they can't corrupt it.
+SKILLS_CACHE_SIZE = 4096
+_skills_cache_lock = threading.Lock()
+_skills_cache = OrderedDict()
+
+
+class ServiceBusyError(Exception):
+    """Raised when a single-flight service is called while a previous call is still running."""
+
+
+def _single_flight(lock):
+    """Run the decorated service under ``lock``, failing fast with ServiceBusyError if it is held."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not lock.acquire(blocking=False):
+                raise ServiceBusyError(f"{func.__name__} is already running")
+            try:
+                return func(*args, **kwargs)
+            finally:
+                lock.release()
+        return wrapper
+    return decorator
+
+# Storing offers, processing their details and sending pending notifications all work
+# on the same pending offers (a fetch notifies its new offers itself), so they share one
+# lock; two overlapping notification passes would post the same offers twice. Cleanup
+# has its own
+_pipeline_lock = threading.Lock()
+_cleanup_lock = threading.Lock()
+
+
+def pipeline_busy():
+    """True while a store, process-details or send-notifications service is running."""
+    return _pipeline_lock.locked()
+
+
+def run_in_background(service, **kwargs):
+    """Run a single-flight service as a background task; a busy service is skipped with a warning."""
+    try:
+        service(**kwargs)
+    except ServiceBusyError as e:
+        logger.warning(f"Service: Background run skipped: {e}")
+
 
 def _apply_relevance_filter(offer_dicts):
     """Score offers (storing the verdict once) and return the subset to notify, annotated.
@@ -53,6 +121,7 @@ def _apply_relevance_filter(offer_dicts):
 
     return kept
 
+@_single_flight(_pipeline_lock)
 def fetch_and_store_offers_service():
     """
     Service layer function to fetch offers, store/update them, process skills for new ones,
@@ -60,6 +129,7 @@ def fetch_and_store_offers_service():
     Returns a dictionary summarizing the operation results.
     """
     start_time = datetime.now()
+    t0 = time.perf_counter()
     logger.info("Service: Starting fetch and store offers process.")
 
     # 1. Fetch raw offers
@@ -89,9 +159,11 @@ def fetch_and_store_offers_service():
     skills_processed_count = 0
     if new_offer_dicts:
         logger.info(f"Service: Found {len(new_offer_dicts)} new offers. Processing skills details...")
-        # We can directly pass the new offers to the processing function if needed,
-        # or rely on the function querying the DB for offers with skills_retrieved = 0
-        skills_processed_count = process_pending_details_service(limit=len(new_offer_dicts)) # Process up to the number of new offers
+        # Process exactly the offers just inserted, without re-querying for pending ones;
+        # their slugs are the stored ones, as process_pending_details_service would read
+        skills_processed_count = _process_detail_offers(
+            [{'offer_id': offer['id'], 'slug': offer['slug']} for offer in new_offer_dicts]
+        )
         logger.info(f"Service: Processed skills for {skills_processed_count} offers.")
         
         # If not all skills were processed, log a warning
@@ -100,63 +172,38 @@ def fetch_and_store_offers_service():
     else:
         logger.info("Service: No new offers found, skipping skills processing step.")
 
-    # 4. Reload new_offer_dicts with the latest data including skills
+    # 4. Keep only the new offers whose skills were retrieved
     if new_offer_dicts:
-        enriched_new_offers = []
+        retrieved_ids = database.get_skills_retrieved_offer_ids([offer['id'] for offer in new_offer_dicts])
         for offer in new_offer_dicts:
-            offer_id = offer.get('id')
-            if offer_id:
-                # Get the full offer details from the database
-                db_offer = database.get_offer_by_id(offer_id)
-                if db_offer:
-                    # Ensure we only send notifications for offers with skills
-                    if db_offer.get('skills_retrieved', False):
-                        # Create a new offer dict with the same structure as original but with DB data
-                        enriched_offer = {
-                            'id': db_offer['offer_id'],
-                            'position': db_offer['position'],
-                            'company': {
-                                'name': db_offer['company_name'],
-                                'logoDark': {'url': db_offer['company_logo_dark_url']} if db_offer['company_logo_dark_url'] else None
-                            },
-                            'remotePercentage': db_offer['remote_percentage'],
-                            'salaryFrom': db_offer['salary_from'],
-                            'salaryTo': db_offer['salary_to'],
-                            'locations': db_offer['locations'].split(', ') if db_offer['locations'] else [],
-                            'slug': db_offer['slug'] if db_offer['slug'] else f"job-{db_offer['offer_id']}"
-                        }
-                        enriched_new_offers.append(enriched_offer)
-                    else:
-                        logger.warning(f"Service: Skipping notification for offer ID {offer_id} because skills have not been retrieved yet.")
-        # Replace the original list with the enriched one
-        new_offer_dicts = enriched_new_offers
+            if offer['id'] not in retrieved_ids:
+                logger.warning(f"Service: Skipping notification for offer ID {offer['id']} because skills have not been retrieved yet.")
+        new_offer_dicts = [offer for offer in new_offer_dicts if offer['id'] in retrieved_ids]
 
     # 4.5 Apply the relevance filter (no-op when FILTER_MODE='off').
     new_offer_dicts = _apply_relevance_filter(new_offer_dicts)
 
     # 5. Send notifications for NEW offers with skills
     webhook_sent_count = 0
-    if new_offer_dicts and CONFIG['DISCORD_WEBHOOK_URL']:
+    webhook_url = CONFIG['DISCORD_WEBHOOK_URL']
+    if new_offer_dicts and webhook_url:
         logger.info(f"Service: Sending {len(new_offer_dicts)} new offers to Discord webhook...")
         # Use the list of new offers directly
-        webhook_sent_count = discord_notifier.send_batch_notifications(new_offer_dicts)
-
-        # Update notification status in DB for successfully sent offers
-        if webhook_sent_count > 0:
-            sent_offer_ids = [offer['id'] for offer in new_offer_dicts[:webhook_sent_count] if 'id' in offer]
-            if sent_offer_ids:
-                database.update_notification_status(sent_offer_ids)
-            else:
-                logger.warning("Webhook reported sending messages, but could not extract offer IDs to update status.")
-    elif not CONFIG['DISCORD_WEBHOOK_URL']:
+        sent_offer_ids = discord_notifier.send_batch_notifications(new_offer_dicts)
+        webhook_sent_count = len(sent_offer_ids)
+
+        # Mark exactly the offers the notifier delivered; messages go out concurrently,
+        # so they need not be the first ones of the list
+        if sent_offer_ids:
+            database.update_notification_status(sent_offer_ids)
+    elif not webhook_url:
          logger.info("Service: Discord webhook URL not configured, skipping notification step.")
     else:
         logger.info("Service: No new offers with skills to notify.")
 
 
     # 6. Return Summary
-    end_time = datetime.now()
-    duration = (end_time - start_time).total_seconds()
+    duration = time.perf_counter() - t0
     logger.info(f"Service: Fetch and store process finished in {duration:.2f} seconds.")
     return {
         "status": "success",
@@ -170,113 +217,97 @@ def fetch_and_store_offers_service():
     }
 
 
+# Where the skills section may live in a job details payload, in lookup order
+_SKILL_PATHS = (('skillsSectionData',), ('content', 'skills'))
+
+def _get_nested(data, path):
+    """Follows path through nested dicts, returning None if any step is missing."""
+    for key in path:
+        data = data.get(key) if isinstance(data, dict) else None
+    return data
+
+def _extract_skills_section(job_details):
+    """Returns the first skills section dict found along _SKILL_PATHS, or None."""
+    for path in _SKILL_PATHS:
+        section = _get_nested(job_details, path)
+        if isinstance(section, dict):
+            return section
+    return None
+
+@_single_flight(_pipeline_lock)
 def process_pending_details_service(limit=10):
     """
     Service layer function to process job offers that don't have detailed skills information yet.
     Returns the number of offers for which skills were successfully processed and stored.
     """
+    return _process_pending_details(limit)
+
+def _process_pending_details(limit):
+    """process_pending_details_service without the lock, for callers already holding it."""
     logger.info(f"Service: Starting process pending job details (limit {limit}).")
-    processed_count = 0
     try:
         # 1. Get offers needing processing from DB
         pending_offers = database.get_pending_skill_offers(limit)
+    except Exception as e:
+        logger.error(f"Service: Error fetching offers pending job details: {e}", exc_info=True)
+        return 0
 
-        if not pending_offers:
-            logger.info("Service: No pending job details to process.")
-            return 0
+    if not pending_offers:
+        logger.info("Service: No pending job details to process.")
+        return 0
 
-        logger.info(f"Service: Found {len(pending_offers)} offers pending skill details.")
+    logger.info(f"Service: Found {len(pending_offers)} offers pending skill details.")
+    return _process_detail_offers(pending_offers)
 
-        # 2. Iterate and process each offer
-        for offer_row in pending_offers:
-            offer_id = offer_row['offer_id']
-            slug = offer_row['slug']
+def _process_detail_offers(pending_offers):
+    """
+    Fetches and stores skills/languages for the given offers ({'offer_id', 'slug'} dicts).
+    Returns the number of offers whose details were successfully stored.
+    """
+    processed_count = 0
+    try:
+        # 2. Fetch details from API for all offers concurrently
+        all_details = manfred_api.fetch_all_job_details(pending_offers)
 
-            # 3. Fetch details from API
-            job_details = manfred_api.fetch_job_details_data(offer_id, slug)
+        # 3. Iterate and extract each offer's skills/languages (written together below)
+        entries, parsed_ids = [], set()
+        for offer_row, job_details in zip(pending_offers, all_details):
+            offer_id = offer_row['offer_id']
 
-            # 4. Extract and Store Skills and Languages
+            # 4. Extract Skills and Languages
             if job_details and isinstance(job_details, dict):
-                # Add additional logging to better diagnose skill section data
-                logger.debug(f"Service: Job details for offer ID {offer_id}, keys: {list(job_details.keys())}")
-                
-                # Improved navigation to find the skills section
-                skills_section = None
-                skills_data = None
-                languages_data = None
-                
-                # Primary path for skills section data
-                if 'skillsSectionData' in job_details and isinstance(job_details.get('skillsSectionData'), dict):
-                    skills_section = job_details.get('skillsSectionData')
-                    logger.debug(f"Service: Found skills section via skillsSectionData for offer ID {offer_id}")
-                
-                # Alternative path in case structure has changed
-                elif 'content' in job_details and isinstance(job_details.get('content'), dict):
-                    content = job_details.get('content')
-                    if 'skills' in content and isinstance(content.get('skills'), dict):
-                        skills_section = content.get('skills')
-                        logger.debug(f"Service: Found skills section via content.skills for offer ID {offer_id}")
-                
-                # Log skills section keys if found
+                skills_data, languages_data = None, None
+                skills_section = _extract_skills_section(job_details)
                 if skills_section:
-                    logger.debug(f"Service: Skills section keys for offer ID {offer_id}: {list(skills_section.keys())}")
-                    
-                    # Get skills data
+                    # The section either wraps the skills or is the skills data itself
                     if 'skills' in skills_section:
-                        skills_data = skills_section.get('skills')
+                        skills_data = skills_section['skills']
                     elif 'must' in skills_section or 'nice' in skills_section or 'extra' in skills_section:
-                        # The section itself might be the skills data
                         skills_data = skills_section
-                    
-                    # Get language requirements
-                    if 'minLanguages' in skills_section:
-                        languages_data = skills_section.get('minLanguages')
-                    elif 'languages' in skills_section:
-                        languages_data = skills_section.get('languages')
-                
-                if skills_data:
-                    logger.debug(f"Service: Found skills data for offer ID {offer_id}: {list(skills_data.keys()) if isinstance(skills_data, dict) else 'not a dict'}")
-                else:
+                    languages_data = skills_section.get('minLanguages', skills_section.get('languages'))
+
+                if not skills_data:
                     logger.warning(f"Service: No skills data found for offer ID {offer_id} in the skills section")
-                
-                skills_stored = False
-                languages_stored = False
-                
-                # Process skills if available
-                if skills_data:
-                    skills_stored = database.store_job_skills(offer_id, skills_data)
-                    if not skills_stored:
-                        logger.warning(f"Service: Failed to store skills for offer ID {offer_id} after fetching details.")
-                else:
-                    # No skills data but mark as retrieved
-                    skills_stored = database.store_job_skills(offer_id, None)
-                
-                # Process languages if available
-                if languages_data:
-                    languages_stored = database.store_job_languages(offer_id, languages_data)
-                    if not languages_stored:
-                        logger.warning(f"Service: Failed to store languages for offer ID {offer_id} after fetching details.")
-                
-                # Mark as processed if either skills or languages were stored or if skills section exists but is empty
-                if skills_stored or languages_stored or skills_section:
-                    logger.info(f"Service: Successfully processed data for offer ID {offer_id}.")
-                    processed_count += 1
-                    # store_job_skills already marks as retrieved, even when skills are missing
-                else:
-                    # Both skills and languages processing failed, but job_details was fetched
-                    logger.warning(f"Service: Fetched details for offer ID {offer_id}, but failed to process skills and languages.")
-                    # Mark as retrieved to avoid retrying indefinitely
-                    database.store_job_skills(offer_id, None) # Pass None to mark as retrieved
+
+                entries.append((offer_id, skills_data, languages_data))
+                parsed_ids.add(offer_id)
             elif job_details is not None:
                  # Details fetched, but skills section missing/empty or structure unexpected
                  logger.warning(f"Service: Fetched details for offer ID {offer_id}, but skills data was missing or in unexpected format. Marking as retrieved.")
                  # Mark as retrieved to avoid retrying this offer indefinitely if skills are genuinely missing
-                 database.store_job_skills(offer_id, None) # Pass None to mark as retrieved
+                 entries.append((offer_id, None, None))
             else:
                  # fetch_job_details failed (logged internally)
                  logger.warning(f"Service: Failed to fetch job details for offer ID {offer_id}. It will be retried later.")
                  # Do not increment processed_count, do not mark as retrieved
 
+        # 5. Store skills and languages for the whole batch in one transaction;
+        # every stored offer is marked as retrieved, even when skills are missing
+        stored_ids = database.store_job_details_bulk(entries)
+        for offer_id in parsed_ids - stored_ids:
+            logger.warning(f"Service: Fetched details for offer ID {offer_id}, but failed to store skills and languages.")
+        processed_count = len(parsed_ids & stored_ids)
+
         logger.info(f"Service: Finished processing pending details. Successfully processed data for {processed_count}/{len(pending_offers)} offers.")
         return processed_count
 
@@ -284,6 +315,24 @@ def process_pending_details_service(limit=10):
         logger.error(f"Service: Error during the overall processing of pending job details: {e}", exc_info=True)
         return processed_count # Return count processed so far
 
+def _row_to_notification_dict(offer_row):
+    """Rebuilds the API-shaped offer dict expected by discord_notifier from a DB row dict."""
+    return {
+        'id': offer_row['offer_id'],
+        'position': offer_row['position'],
+        'company': {
+            'name': offer_row['company_name'],
+            'logoDark': {'url': offer_row['company_logo_dark_url']} if offer_row['company_logo_dark_url'] else None
+        },
+        'remotePercentage': offer_row['remote_percentage'],
+        'salaryFrom': offer_row['salary_from'],
+        'salaryTo': offer_row['salary_to'],
+        # Locations are stored as a JSON array
+        'locations': orjson.loads(offer_row['locations']) if offer_row['locations'] else [],
+        'slug': offer_row['slug'] or f"job-{offer_row['offer_id']}"
+    }
+
+@_single_flight(_pipeline_lock)
 def send_pending_notifications_service(limit=5):
     """
     Service layer function to find pending notifications and send them.
@@ -299,7 +348,8 @@ def send_pending_notifications_service(limit=5):
     offers_to_send_dicts = []
     try:
         # 1. Get offers pending notification from DB
-        pending_db_offers = database.get_pending_notification_offers(limit=limit * 2) # Fetch more to estimate remaining
+        # Fetch extra rows so offers dropped by the relevance filter don't leave the batch short
+        pending_db_offers, pending_total = database.get_pending_notification_page(limit=limit * 2)
         if not pending_db_offers:
              logger.info("Service: No pending notifications found in database.")
              return 0, 0
@@ -307,41 +357,22 @@ def send_pending_notifications_service(limit=5):
         logger.info(f"Service: Found {len(pending_db_offers)} potential offers pending notification.")
 
         # 2. Convert DB rows to dictionaries expected by notifier
-        for offer_row in pending_db_offers:
-             # Reconstruct the dictionary format needed by _build_discord_embed
-             offers_to_send_dicts.append({
-                 'id': offer_row['offer_id'],
-                 'position': offer_row['position'],
-                 'company': {
-                     'name': offer_row['company_name'],
-                     # Ensure logoDark structure exists if URL is present
-                     'logoDark': {'url': offer_row['company_logo_dark_url']} if offer_row['company_logo_dark_url'] else None
-                 },
-                 'remotePercentage': offer_row['remote_percentage'],
-                 'salaryFrom': offer_row['salary_from'],
-                 'salaryTo': offer_row['salary_to'],
-                 # Safely split locations string back into a list
-                 'locations': offer_row['locations'].split(', ') if offer_row['locations'] else [],
-                 'slug': offer_row['slug'] if offer_row['slug'] else f"job-{offer_row['offer_id']}"
-             })
+        offers_to_send_dicts = [_row_to_notification_dict(offer_row) for offer_row in pending_db_offers]
 
         # 2.5 Apply the relevance filter (no-op when FILTER_MODE='off').
         offers_to_send_dicts = _apply_relevance_filter(offers_to_send_dicts)
 
         # 3. Send notifications in a batch
         if offers_to_send_dicts:
-            offers_sent_count = discord_notifier.send_batch_notifications(offers_to_send_dicts, batch_size=limit)
-
-            # 4. Update DB status for successfully sent offers
-            if offers_sent_count > 0:
-                sent_offer_ids = [offer['id'] for offer in offers_to_send_dicts[:offers_sent_count] if 'id' in offer]
-                if sent_offer_ids:
-                     database.update_notification_status(sent_offer_ids)
-                else:
-                    logger.warning("Notifier reported sending messages, but could not extract offer IDs to update status.")
-
-        remaining_pending = max(0, len(pending_db_offers) - offers_sent_count)
-        logger.info(f"Service: Finished sending pending notifications. Sent: {offers_sent_count}, Approx Remaining: {remaining_pending}")
+            sent_offer_ids = discord_notifier.send_batch_notifications(offers_to_send_dicts, batch_size=limit)
+            offers_sent_count = len(sent_offer_ids)
+
+            # 4. Update DB status for exactly the offers the notifier delivered
+            if sent_offer_ids:
+                database.update_notification_status(sent_offer_ids)
+
+        remaining_pending = max(0, pending_total - offers_sent_count)
+        logger.info(f"Service: Finished sending pending notifications. Sent: {offers_sent_count}, Remaining: {remaining_pending}")
         return offers_sent_count, remaining_pending
 
     except Exception as e:
@@ -353,43 +384,46 @@ def send_pending_notifications_service(limit=5):
 def get_job_skills_service(offer_id):
     """Service layer function to retrieve skills and languages for a specific job offer."""
     logger.info(f"Service: Retrieving skills and languages for offer ID {offer_id}.")
-    # Check if offer exists first
-    offer_exists = database.get_offer_by_id(offer_id)
-    if not offer_exists:
+    with _skills_cache_lock:
+        result = _skills_cache.get(offer_id)
+        if result is not None:
+            _skills_cache.move_to_end(offer_id)
+            return copy.deepcopy(result)
+
+    # Existence, skills and languages in one session (None if the offer doesn't exist)
+    result = database.get_offer_skills_and_languages(offer_id)
+    if result is None:
         logger.warning(f"Service: Offer ID {offer_id} not found in database.")
         return None # Indicate not found
 
-    # Get skills data
-    skills = database.get_job_skills_from_db(offer_id)
-    
-    # Get languages data
-    languages = database.get_job_languages_from_db(offer_id)
-    
-    # Return combined result
-    result = {
-        'skills': skills,
-        'languages': languages
-    }
-    
+    # Skills are only reported once retrieved, so any skill means the result is final
+    if any(result['skills'].values()):
+        with _skills_cache_lock:
+            _skills_cache[offer_id] = copy.deepcopy(result)
+            if len(_skills_cache) > SKILLS_CACHE_SIZE:
+                _skills_cache.popitem(last=False)
+
     return result
 
+def _cached_db_check():
+    """database.check_db_connection(), reused for HEALTH_CHECK_TTL seconds; concurrent misses share one check."""
+    with _db_check_lock:
+        if _db_check['result'] is None or time.monotonic() - _db_check['at'] >= HEALTH_CHECK_TTL:
+            _db_check['result'] = database.check_db_connection()
+            _db_check['at'] = time.monotonic()
+        return _db_check['result']
+
 def get_health_status_service():
     """Service layer function to check system health."""
     logger.debug("Service: Performing health check.")
-    db_ok, db_status_msg = database.check_db_connection()
+    db_ok, db_status_msg = _cached_db_check()
     webhook_configured = bool(CONFIG['DISCORD_WEBHOOK_URL'])
 
     is_healthy = db_ok # Add other checks here if needed
 
-    # Selectively expose configuration relevant to health/operation
-    relevant_config = {
-        k: CONFIG[k] for k in [
-            'EXTERNAL_ENDPOINT_URL',
-            'MAX_RETRIES',
-            'RETRY_BACKOFF',
-            'BUILD_ID_HASH' # Important for details fetching
-            ] if k in CONFIG
-        }
+    # Selectively expose configuration relevant to health/operation; read on each
+    # call since BUILD_ID_HASH changes at runtime
+    relevant_config = {k: CONFIG[k] for k in _HEALTH_CONFIG_KEYS if k in CONFIG}
 
     health_status = {
         "status": "healthy" if is_healthy else "unhealthy",
@@ -399,9 +433,10 @@ def get_health_status_service():
         "webhook_configured": webhook_configured,
         "config": relevant_config
     }
-    logger.debug(f"Service: Health status: {health_status}")
+    logger.debug("Service: Health status: %s", health_status)
     return health_status, is_healthy
 
+@_single_flight(_cleanup_lock)
 def cleanup_obsolete_job_notifications_service():
     """
     Service layer function to find jobs that are no longer in the latest fetch 
@@ -433,23 +468,24 @@ def cleanup_obsolete_job_notifications_service():
         
         logger.info(f"Service: Found {len(obsolete_offers)} obsolete Discord notifications to clean up.")
         
-        # 3. Delete each obsolete Discord message
+        # 3. Delete the obsolete Discord messages concurrently (once, even if several offers share one)
+        obsolete_offers = [offer for offer in obsolete_offers if offer.get('discord_message_id')]
+        deleted_message_ids = discord_notifier.delete_discord_messages(
+            offer['discord_message_id'] for offer in obsolete_offers
+        )
+
+        cleared_offer_ids = []
         for offer in obsolete_offers:
-            offer_id = offer.get('offer_id')
-            message_id = offer.get('discord_message_id')
-            
-            if not message_id:
-                continue
-            
-            # Delete the Discord message
-            success = discord_notifier.delete_discord_message(message_id)
-            if success:
-                # Update the database to clear the message ID
-                database.clear_discord_message_id(offer_id)
-                deleted_count += 1
+            offer_id, message_id = offer['offer_id'], offer['discord_message_id']
+            if message_id in deleted_message_ids:
+                cleared_offer_ids.append(offer_id)
                 logger.info(f"Service: Successfully deleted Discord message {message_id} for obsolete offer ID {offer_id}")
             else:
                 logger.warning(f"Service: Failed to delete Discord message {message_id} for obsolete offer ID {offer_id}")
+
+        # 4. Clear the message IDs of all cleaned-up offers in one update
+        database.clear_discord_message_ids(cleared_offer_ids)
+        deleted_count = len(cleared_offer_ids)
         
         logger.info(f"Service: Finished cleanup. Deleted {deleted_count}/{len(obsolete_offers)} obsolete Discord notifications.")
         return deleted_count
@@ -14,11 +14,15 @@ os.environ.setdefault("DISCORD_WEBHOOK_URL", "")
 import pytest
 
 import database
+import services
 
 
 @pytest.fixture(autouse=True)
-def fresh_db():
+def fresh_db(monkeypatch):
     """Give every test a clean schema on the isolated SQLite database."""
+    monkeypatch.setattr(services, "_db_check", {"at": 0.0, "result": None})
+    services._skills_cache.clear()
+    database.flush_fetch_log()  # no background writes into the schema being reset
     database.Session.remove()
     database.Base.metadata.drop_all(database.engine)
     database.Base.metadata.create_all(database.engine)
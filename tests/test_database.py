@@ -40,15 +40,42 @@ def test_store_new_then_update_counts():
     assert [d["id"] for d in new_dicts2] == [3]
 
 
+def test_store_returns_new_offers_shaped_for_notification():
+    _, _, new_dicts = database.store_or_update_offers([
+        _offer(1, locations=["A", None, "B"]),
+        _offer(2, slug="", company={"name": "NoLogo"}),
+    ])
+    first, second = new_dicts
+    assert first["locations"] == ["A", "B"]
+    assert first["company"] == {"name": "ACME", "logoDark": {"url": "http://logo/x.png"}}
+    assert second["company"] == {"name": "NoLogo", "logoDark": None}
+    assert second["slug"] is None
+    assert database.get_offer_by_id(2)["slug"] is None
+
+
+def test_store_prefetches_existing_offers_in_chunks(monkeypatch):
+    database.store_or_update_offers([_offer(1), _offer(2), _offer(3)])
+    monkeypatch.setattr(database, "_IN_CLAUSE_CHUNK", 2)
+
+    new, updated, _ = database.store_or_update_offers(
+        [_offer(1, position="Renamed"), _offer(3), _offer(4), _offer(4, position="Dup")]
+    )
+
+    # The repeated id 4 is inserted once, then updated from its second occurrence.
+    assert (new, updated) == (1, 3)
+    assert database.get_offer_by_id(1)["position"] == "Renamed"
+    assert database.get_offer_by_id(4)["position"] == "Dup"
+
+
 def test_store_skips_offer_without_id():
     new, updated, new_dicts = database.store_or_update_offers([{"position": "no id"}])
     assert (new, updated, new_dicts) == (0, 0, [])
 
 
 def test_store_parses_locations_and_logo_and_defaults():
-    database.store_or_update_offers([_offer(10, locations=["A", "B"])])
+    database.store_or_update_offers([_offer(10, locations=["A", "Comma, Town"])])
     row = database.get_offer_by_id(10)
-    assert row["locations"] == "A, B"
+    assert row["locations"] == '["A","Comma, Town"]'
     assert row["company_logo_dark_url"] == "http://logo/x.png"
     assert row["notification_sent"] is False
     assert row["skills_retrieved"] is False
@@ -98,6 +125,31 @@ def test_get_skills_empty_when_not_retrieved():
     assert database.get_job_skills_from_db(1) == {"must": [], "nice": [], "extra": []}
 
 
+def test_get_skills_bulk_keys_every_requested_offer():
+    database.store_or_update_offers([_offer(1), _offer(2), _offer(3)])
+    database.store_job_skills(1, SKILLS)
+    database.store_job_skills(2, {"must": [{"skill": "Go", "level": 1}], "nice": [], "extra": []})
+
+    got = database.get_job_skills_from_db_bulk([1, 2, 3])
+    assert [s["skill"] for s in got[1]["must"]] == ["Python"]
+    assert [s["skill"] for s in got[1]["nice"]] == ["Docker"]
+    assert [s["skill"] for s in got[2]["must"]] == ["Go"]
+    # Offer 3's skills were never retrieved -> empty shape.
+    assert got[3] == {"must": [], "nice": [], "extra": []}
+
+
+def test_get_skills_bulk_empty_ids_returns_empty():
+    assert database.get_job_skills_from_db_bulk([]) == {}
+
+
+def test_skills_retrieved_offer_ids_filters_missing_and_pending():
+    database.store_or_update_offers([_offer(1), _offer(2)])
+    database.store_job_skills(1, SKILLS)
+
+    assert database.get_skills_retrieved_offer_ids([1, 2, 99]) == {1}
+    assert database.get_skills_retrieved_offer_ids([]) == set()
+
+
 # --- languages -------------------------------------------------------------
 
 def test_store_and_get_languages():
@@ -111,6 +163,62 @@ def test_store_languages_empty_returns_false():
     assert database.store_job_languages(1, []) is False
 
 
+def test_get_languages_bulk_keys_every_requested_offer():
+    database.store_or_update_offers([_offer(1), _offer(2)])
+    database.store_job_languages(1, [{"name": "English", "level": "C1"}])
+
+    got = database.get_job_languages_from_db_bulk([1, 2])
+    assert got == {1: [{"name": "English", "level": "C1"}], 2: []}
+
+
+def test_store_job_details_bulk_writes_all_offers_in_one_go():
+    database.store_or_update_offers([_offer(1), _offer(2)])
+
+    stored = database.store_job_details_bulk([
+        (1, SKILLS, [{"name": "English", "level": "C1"}]),
+        (2, None, None),
+        (999, SKILLS, None),
+    ])
+
+    assert stored == {1, 2}
+    assert database.get_skills_retrieved_offer_ids([1, 2]) == {1, 2}
+    assert database.get_job_languages_from_db(1) == [{"name": "English", "level": "C1"}]
+    assert database.get_job_skills_from_db_bulk([2])[2] == {"must": [], "nice": [], "extra": []}
+
+
+def test_store_job_details_bulk_skips_only_the_failing_offer():
+    database.store_or_update_offers([_offer(1), _offer(2), _offer(3)])
+    bad_skills = {"must": [{"skill": None, "level": 1}], "nice": [], "extra": []}
+
+    stored = database.store_job_details_bulk([
+        (1, SKILLS, None),
+        (2, bad_skills, None),
+        (3, None, [{"name": "English", "level": "B2"}]),
+    ])
+
+    assert stored == {1, 3}
+    assert database.get_skills_retrieved_offer_ids([1, 2, 3]) == {1, 3}
+    assert database.get_job_skills_from_db(1)["must"]
+    assert database.get_job_languages_from_db(3) == [{"name": "English", "level": "B2"}]
+
+
+def test_offer_skills_and_languages_matches_separate_getters():
+    database.store_or_update_offers([_offer(1), _offer(2)])
+    database.store_job_skills(1, SKILLS)
+    database.store_job_languages(1, [{"name": "English", "level": "B2"}])
+
+    combined = database.get_offer_skills_and_languages(1)
+    assert combined == {
+        "skills": database.get_job_skills_from_db(1),
+        "languages": database.get_job_languages_from_db(1),
+    }
+    # Offer 2 exists but skills aren't retrieved yet; unknown offers are None.
+    assert database.get_offer_skills_and_languages(2) == {
+        "skills": {"must": [], "nice": [], "extra": []}, "languages": []
+    }
+    assert database.get_offer_skills_and_languages(999) is None
+
+
 # --- notification status ---------------------------------------------------
 
 def test_pending_notifications_and_status_update():
@@ -123,6 +231,17 @@ def test_pending_notifications_and_status_update():
     assert {o["offer_id"] for o in pending_after} == {2}
 
 
+def test_pending_notification_page_counts_all_pending():
+    database.store_or_update_offers([_offer(1), _offer(2), _offer(3)])
+
+    offers, total = database.get_pending_notification_page(limit=2)
+
+    assert len(offers) == 2
+    assert total == 3
+    database.update_notification_status([1, 2, 3])
+    assert database.get_pending_notification_page(limit=2) == ([], 0)
+
+
 # --- pending skill offers --------------------------------------------------
 
 def test_pending_skill_offers_excludes_retrieved():
@@ -144,10 +263,22 @@ def test_obsolete_discord_notifications_lifecycle():
     assert [o["offer_id"] for o in obsolete] == [1]
     assert obsolete[0]["discord_message_id"] == "msg-1"
 
-    assert database.clear_discord_message_id(1) is True
+    assert database.clear_discord_message_ids([1]) == 1
     assert database.get_obsolete_discord_notifications([2]) == []
 
 
+def test_shared_discord_message_obsolete_only_when_all_offers_inactive():
+    database.store_or_update_offers([_offer(1), _offer(2), _offer(3)])
+    database.update_discord_message_id(1, "shared")
+    database.update_discord_message_id(2, "shared")
+
+    # Offer 2 is still active, so the message it shares with offer 1 must stay.
+    assert database.get_obsolete_discord_notifications([2, 3]) == []
+
+    obsolete = database.get_obsolete_discord_notifications([3])
+    assert sorted(o["offer_id"] for o in obsolete) == [1, 2]
+
+
 # --- relevance columns -----------------------------------------------------
 
 def test_store_relevance_persists_and_marks_processed():
@@ -183,3 +314,106 @@ def test_migration_adds_missing_relevance_columns():
 
     cols = {c["name"] for c in inspect(database.engine).get_columns("job_offers")}
     assert {"relevance_score", "relevance_reason", "filter_processed"} <= cols
+
+
+def test_migration_rewrites_legacy_locations_as_json():
+    from sqlalchemy import text
+
+    database.store_or_update_offers([_offer(1), _offer(2, locations=[])])
+    with database.engine.begin() as conn:
+        conn.execute(text("UPDATE job_offers SET locations = 'Madrid, Remote' WHERE offer_id = 1"))
+
+    database._migrate_locations_to_json()
+    database._migrate_locations_to_json()  # idempotent
+
+    assert database.get_offer_by_id(1)["locations"] == '["Madrid","Remote"]'
+    assert database.get_offer_by_id(2)["locations"] is None
+
+
+def test_ensure_indexes_adds_missing_indexes():
+    from sqlalchemy import text, inspect
+
+    with database.engine.begin() as conn:
+        conn.execute(text("DROP INDEX idx_job_skills_offer_id_category"))
+        conn.execute(text("DROP INDEX idx_fetch_history_timestamp"))
+
+    database._ensure_indexes()
+
+    insp = inspect(database.engine)
+    assert "idx_job_skills_offer_id_category" in {i["name"] for i in insp.get_indexes("job_skills")}
+    assert "idx_fetch_history_timestamp" in {i["name"] for i in insp.get_indexes("fetch_history")}
+
+
+def test_connections_use_wal_and_tuned_pragmas():
+    from sqlalchemy import text
+
+    with database.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+
+
+def test_queued_fetch_attempts_written_after_flush():
+    database.queue_fetch_attempt("http://test/a", 500, 10, "boom")
+    database.queue_fetch_attempt("http://test/b")
+    database.flush_fetch_log()
+
+    session = database.Session()
+    try:
+        rows = session.query(database.FetchHistory).order_by(database.FetchHistory.endpoint).all()
+        assert [(r.endpoint, r.status_code, r.error) for r in rows] == [
+            ("http://test/a", 500, "boom"), ("http://test/b", None, None),
+        ]
+    finally:
+        session.close()
+
+
+def test_fetch_log_writer_survives_session_errors(monkeypatch):
+    real_session = database.Session
+
+    class FlakySession:
+        """Fails to open the first session, then behaves like the real scoped_session."""
+        failed = False
+
+        def __call__(self):
+            if not self.failed:
+                self.failed = True
+                raise RuntimeError("database is locked")
+            return real_session()
+
+        def remove(self):
+            real_session.remove()
+
+    monkeypatch.setattr(database, "Session", FlakySession())
+
+    database.queue_fetch_attempt("http://test/lost")
+    assert database.flush_fetch_log(timeout=5) is True  # the failed batch is still marked done
+    database.queue_fetch_attempt("http://test/kept")
+    assert database.flush_fetch_log(timeout=5) is True
+
+    session = real_session()
+    try:
+        assert [r.endpoint for r in session.query(database.FetchHistory).all()] == ["http://test/kept"]
+    finally:
+        session.close()
+
+
+def test_flush_fetch_log_is_bounded(monkeypatch):
+    monkeypatch.setattr(database._fetch_log_queue, "unfinished_tasks", 1)
+    assert database.flush_fetch_log(timeout=0.05) is False
+
+
+def test_prune_fetch_history_keeps_newest_rows():
+    for i in range(5):
+        database.queue_fetch_attempt(f"http://test/{i}")
+    database.flush_fetch_log()
+
+    assert database.prune_fetch_history(max_rows=2) == 3
+    assert database.prune_fetch_history(max_rows=2) == 0
+
+    session = database.Session()
+    try:
+        endpoints = sorted(r.endpoint for r in session.query(database.FetchHistory).all())
+        assert endpoints == ["http://test/3", "http://test/4"]
+    finally:
+        session.close()
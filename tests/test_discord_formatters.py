@@ -9,7 +9,7 @@ def test_embed_includes_relevance_reason():
         "relevance_reason": "Strong Python match", "relevance_score": 88,
     }
     embed = discord_notifier._build_discord_embed(offer)
-    field_names = [f["name"] for f in embed.fields]
+    field_names = [f["name"] for f in embed["fields"]]
     assert any("Why it matched" in name for name in field_names)
 
 
@@ -28,6 +28,11 @@ def test_format_skills_without_level_has_no_stars():
     assert _format_skills_for_field([{"skill": "Bash"}]) == "• Bash"
 
 
+def test_format_skills_clamps_out_of_range_levels():
+    assert _format_skills_for_field([{"skill": "Bash", "level": -2}]) == "• Bash"
+    assert _format_skills_for_field([{"skill": "Go", "level": 9}]) == "• Go (★★★★★)"
+
+
 def test_format_skills_truncates_to_discord_limit():
     many = [{"skill": "S" * 50, "level": 1} for _ in range(100)]
     out = _format_skills_for_field(many)
@@ -36,9 +41,102 @@ def test_format_skills_truncates_to_discord_limit():
     assert out.endswith("...")
 
 
+def test_format_skills_truncates_on_line_boundary():
+    many = [{"skill": f"Skill{i}"} for i in range(200)]
+    out = _format_skills_for_field(many)
+    lines = out.split("\n")
+    # Every kept line is a whole skill entry; the marker replaces the overflow.
+    assert lines[-1] == "..."
+    assert all(line.startswith("• Skill") for line in lines[:-1])
+
+
 def test_format_language_capitalizes_level():
     assert _format_language_for_field([{"name": "English", "level": "c1"}]) == "• English: C1"
 
 
 def test_format_language_empty_returns_none():
     assert _format_language_for_field([]) is None
+
+
+def test_format_language_truncates_on_line_boundary():
+    many = [{"name": f"Language{i}", "level": "b2"} for i in range(200)]
+    out = _format_language_for_field(many)
+    lines = out.split("\n")
+    assert len(out) <= 1024
+    assert lines[-1] == "..."
+    assert all(line.startswith("• Language") and line.endswith(": B2") for line in lines[:-1])
+
+
+def test_embed_uses_shared_timestamp_and_static_footer():
+    offer = {"id": 1, "position": "Backend", "company": {"name": "ACME"}, "slug": "x", "remotePercentage": 100}
+    ts = "2024-01-01T00:00:00+00:00"
+    embed = discord_notifier._build_discord_embed(
+        offer, skills={"must": [], "nice": [], "extra": []}, languages=[], timestamp=ts
+    )
+    assert embed["timestamp"] == ts
+    assert embed["footer"] == {"text": "Via Manfred Job Fetcher"}
+    assert embed["url"] == "https://www.getmanfred.com/es/job-offers/1/x"
+
+
+def test_fmt_eur_uses_dot_thousands_separator():
+    assert discord_notifier._fmt_eur(40000) == "40.000€"
+    assert discord_notifier._fmt_eur(1234567) == "1.234.567€"
+    assert discord_notifier._fmt_eur(500) == "500€"
+
+
+def test_embed_title_and_thumbnail_from_company():
+    offer = {
+        "id": 1, "position": "Backend", "slug": "x", "remotePercentage": 100,
+        "company": {"name": "ACME", "logoDark": {"url": "http://logo/x.png"}},
+    }
+    first = discord_notifier._build_discord_embed(offer, skills={}, languages=[])
+    second = discord_notifier._build_discord_embed(offer, skills={}, languages=[])
+
+    assert first["title"] == "Backend @ ACME"
+    assert first["thumbnail"] == {"url": "http://logo/x.png"}
+    # Each embed gets its own thumbnail dict.
+    assert first["thumbnail"] is not second["thumbnail"]
+
+
+def test_embed_tolerates_null_company_and_locations_entries():
+    offer = {"id": 1, "position": "Backend", "company": None, "locations": ["Madrid", None]}
+    embed = discord_notifier._build_discord_embed(offer, skills={}, languages=[])
+    assert embed["title"] == "Backend @ Unknown Company"
+    details = next(f["value"] for f in embed["fields"] if "Job Details" in f["name"])
+    assert "📍 **Location:** Madrid" in details
+
+
+def test_embed_invalid_offer_shape_returns_none():
+    offer = {"id": 1, "position": "Backend", "salaryFrom": "a lot"}
+    assert discord_notifier._build_discord_embed(offer, skills={}, languages=[]) is None
+
+
+def test_embed_accepts_fractional_and_string_numbers():
+    offer = {
+        "id": 1, "position": "Backend", "slug": "x", "salaryFrom": 40000.5, "salaryTo": "50000",
+        "remotePercentage": 50.0, "relevance_score": "87.6", "relevance_reason": "Python",
+    }
+    embed = discord_notifier._build_discord_embed(offer, skills={}, languages=[])
+    details = next(f["value"] for f in embed["fields"] if "Job Details" in f["name"])
+    assert "40.000€ - 50.000€" in details
+    assert "50% Remote" in details
+    assert any(f["name"] == "🤖 Why it matched (88/100)" for f in embed["fields"])
+
+
+def test_embed_without_any_content_has_no_fields():
+    offer = {"id": 1, "position": "Backend", "company": {"name": "ACME"}, "slug": "x"}
+    empty_skills = {"must": [], "nice": [], "extra": []}
+    embed = discord_notifier._build_discord_embed(offer, skills=empty_skills, languages=[])
+    assert embed["fields"] == []
+
+
+def test_embed_fields_follow_current_skills():
+    offer = {"id": 1, "position": "Backend", "company": {"name": "ACME"}, "remotePercentage": 100}
+    skills = {"must": [{"skill": "Python", "level": 2}], "nice": [], "extra": []}
+
+    first = discord_notifier._build_discord_embed(offer, skills=skills, languages=[])
+    assert "Python (★★)" in next(f["value"] for f in first["fields"] if "Must Have" in f["name"])
+
+    skills["must"][0]["level"] = 3
+    second = discord_notifier._build_discord_embed(offer, skills=skills, languages=[])
+    assert "★★★" in next(f["value"] for f in second["fields"] if "Must Have" in f["name"])
@@ -0,0 +1,309 @@
+"""Tests for the Discord webhook transport, with the HTTP client mocked (no network)."""
+import json
+
+import orjson
+import pytest
+
+import discord_notifier
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, json_data=None, headers=None):
+        self.status_code = status_code
+        self._json = json_data or {}
+        self.headers = headers or {}
+        self.content = json.dumps(self._json).encode()
+
+    def json(self):
+        return self._json
+
+
+class FakeClient:
+    """Returns queued responses in order, recording each POST and DELETE."""
+
+    def __init__(self, responses):
+        self._responses = list(responses)
+        self.posts = []
+        self.deletes = []
+
+    def request(self, method, url, **kwargs):
+        (self.posts if method == "POST" else self.deletes).append((url, kwargs))
+        return self._responses.pop(0)
+
+
+@pytest.fixture
+def patch_client(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(discord_notifier.time, "sleep", lambda s: sleeps.append(s))
+    monkeypatch.setitem(discord_notifier.CONFIG, "MAX_RETRIES", 3)
+
+    def install(responses):
+        monkeypatch.setattr(discord_notifier, "_discord_limiter", discord_notifier._TokenBucket(100, 1))
+        monkeypatch.setattr(discord_notifier, "_discord_breaker", discord_notifier._CircuitBreaker(5, 30))
+        client = FakeClient(responses)
+        monkeypatch.setattr(discord_notifier, "discord_client", client)
+        return client, sleeps
+
+    return install
+
+
+def _webhook():
+    return "http://discord/webhook", {"content": "hi", "embeds": [{"title": "Backend @ ACME"}]}
+
+
+def test_execute_webhook_posts_orjson_body_with_wait(patch_client):
+    client, sleeps = patch_client([FakeResponse(200, {"id": "m1"})])
+
+    resp = discord_notifier._execute_webhook(*_webhook())
+
+    assert resp.status_code == 200
+    url, kwargs = client.posts[0]
+    assert url == "http://discord/webhook"
+    assert kwargs["params"] == {"wait": "true"}
+    body = orjson.loads(kwargs["content"])
+    assert body["content"] == "hi"
+    assert body["embeds"][0]["title"] == "Backend @ ACME"
+    assert "wait" not in body
+    assert sleeps == []
+
+
+def test_execute_webhook_retries_after_rate_limit(patch_client):
+    client, sleeps = patch_client([
+        FakeResponse(429, {"retry_after": 0.5}),
+        FakeResponse(200, {"id": "m1"}),
+    ])
+
+    resp = discord_notifier._execute_webhook(*_webhook())
+
+    assert resp.status_code == 200
+    assert len(client.posts) == 2
+    # retry_after from the body plus up to 0.5s of jitter
+    assert len(sleeps) == 1 and 0.49 <= sleeps[0] <= 1.0
+
+
+def test_execute_webhook_prefers_retry_after_header(patch_client):
+    client, sleeps = patch_client([
+        FakeResponse(429, {"retry_after": 10}, headers={"Retry-After": "2"}),
+        FakeResponse(200, {"id": "m1"}),
+    ])
+
+    discord_notifier._execute_webhook(*_webhook())
+
+    assert len(sleeps) == 1 and 1.99 <= sleeps[0] <= 2.5
+
+
+def test_execute_webhook_caps_retry_after(patch_client, monkeypatch):
+    monkeypatch.setitem(discord_notifier.CONFIG, "RETRY_MAX_SLEEP", 5.0)
+    client, sleeps = patch_client([
+        FakeResponse(429, headers={"Retry-After": "3600"}),
+        FakeResponse(200, {"id": "m1"}),
+    ])
+
+    discord_notifier._execute_webhook(*_webhook())
+
+    assert len(sleeps) == 1 and 5.0 <= sleeps[0] <= 5.5
+
+
+def test_execute_webhook_gives_up_after_max_retries(patch_client):
+    client, sleeps = patch_client([FakeResponse(429, {"retry_after": 0})] * 4)
+
+    resp = discord_notifier._execute_webhook(*_webhook())
+
+    assert resp.status_code == 429
+    assert len(client.posts) == 4
+    assert len(sleeps) == 3
+
+
+# --- send_batch_notifications ----------------------------------------------
+
+def _stored_offer(offer_id):
+    import database
+    database.store_or_update_offers([{
+        "id": offer_id, "position": "Backend", "company": {"name": "ACME"}, "slug": f"b-{offer_id}",
+    }])
+    database.store_job_skills(offer_id, {"must": [{"skill": "Python", "level": 3}], "nice": [], "extra": []})
+    return {"id": offer_id, "position": "Backend", "company": {"name": "ACME"}, "slug": f"b-{offer_id}"}
+
+
+def test_batch_coalesces_embeds_per_message(patch_client, monkeypatch):
+    import database
+    monkeypatch.setitem(discord_notifier.CONFIG, "DISCORD_WEBHOOK_URL", "http://discord/webhook")
+    monkeypatch.setitem(discord_notifier.CONFIG, "DISCORD_EMBEDS_PER_MESSAGE", 2)
+    offers = [_stored_offer(i) for i in (1, 2, 3)]
+    client, _ = patch_client([FakeResponse(200, {"id": "m1"}), FakeResponse(200, {"id": "m2"})])
+
+    sent = discord_notifier.send_batch_notifications(offers)
+
+    assert sorted(sent) == [1, 2, 3]
+    bodies = [orjson.loads(kwargs["content"]) for _, kwargs in client.posts]
+    assert sorted(len(b["embeds"]) for b in bodies) == [1, 2]
+    # Messages are posted concurrently, so which one got "m1" is not fixed; offers
+    # 1 and 2 share a message, offer 3 has its own.
+    ids = {i: database.get_offer_by_id(i)["discord_message_id"] for i in (1, 2, 3)}
+    assert ids[1] == ids[2]
+    assert {ids[1], ids[3]} == {"m1", "m2"}
+
+
+def test_batch_splits_messages_at_discord_embed_size_limit(patch_client, monkeypatch):
+    import database
+    monkeypatch.setitem(discord_notifier.CONFIG, "DISCORD_WEBHOOK_URL", "http://discord/webhook")
+    monkeypatch.setitem(discord_notifier.CONFIG, "DISCORD_EMBEDS_PER_MESSAGE", 10)
+    offers = [_stored_offer(i) for i in range(1, 7)]
+    long_skills = [{"skill": f"Skill{n:02d}" + "x" * 40, "level": 3} for n in range(30)]
+    for offer in offers:
+        database.store_job_skills(offer["id"], {"must": long_skills, "nice": [], "extra": []})
+    client, _ = patch_client([FakeResponse(200, {"id": "m1"}), FakeResponse(200, {"id": "m2"})])
+
+    sent = discord_notifier.send_batch_notifications(offers, batch_size=10)
+
+    assert sorted(sent) == [1, 2, 3, 4, 5, 6]
+    bodies = [orjson.loads(kwargs["content"]) for _, kwargs in client.posts]
+    assert [len(b["embeds"]) for b in bodies] == [5, 1]
+    assert all(sum(map(discord_notifier._embed_length, b["embeds"])) <= 6000 for b in bodies)
+
+
+def test_batch_sends_one_message_per_offer_by_default(patch_client, monkeypatch):
+    monkeypatch.setitem(discord_notifier.CONFIG, "DISCORD_WEBHOOK_URL", "http://discord/webhook")
+    offers = [_stored_offer(i) for i in (1, 2)]
+    client, _ = patch_client([FakeResponse(200, {"id": "m1"}), FakeResponse(200, {"id": "m2"})])
+
+    assert sorted(discord_notifier.send_batch_notifications(offers)) == [1, 2]
+    assert len(client.posts) == 2
+
+
+def test_batch_skips_offers_without_retrieved_skills(patch_client, monkeypatch):
+    import database
+    monkeypatch.setitem(discord_notifier.CONFIG, "DISCORD_WEBHOOK_URL", "http://discord/webhook")
+    ready = _stored_offer(1)
+    database.store_or_update_offers([{"id": 2, "position": "Frontend", "company": {"name": "ACME"}, "slug": "f-2"}])
+    pending = {"id": 2, "position": "Frontend", "company": {"name": "ACME"}, "slug": "f-2"}
+    client, _ = patch_client([FakeResponse(200, {"id": "m1"})])
+
+    assert discord_notifier.send_batch_notifications([ready, pending]) == [1]
+    assert len(client.posts) == 1
+    assert database.get_offer_by_id(2)["discord_message_id"] is None
+
+
+def test_batch_counts_contentless_offers_as_handled_without_posting(patch_client, monkeypatch):
+    import database
+    monkeypatch.setitem(discord_notifier.CONFIG, "DISCORD_WEBHOOK_URL", "http://discord/webhook")
+    database.store_or_update_offers([{"id": 5, "position": "Bare", "company": {"name": "ACME"}, "slug": "b-5"}])
+    database.store_job_skills(5, None)  # retrieved, but no skills
+    bare = {"id": 5, "position": "Bare", "company": {"name": "ACME"}, "slug": "b-5"}
+    client, _ = patch_client([])
+
+    assert discord_notifier.send_batch_notifications([bare]) == [5]
+    assert client.posts == []
+    assert database.get_offer_by_id(5)["discord_message_id"] is None
+
+
+# --- _TokenBucket ----------------------------------------------------------
+
+def test_token_bucket_allows_burst_then_waits(monkeypatch):
+    clock = [0.0]
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(discord_notifier.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(discord_notifier.time, "sleep", fake_sleep)
+    bucket = discord_notifier._TokenBucket(5, 2)
+
+    for _ in range(5):
+        bucket.acquire()
+    assert sleeps == []  # the burst drains the bucket without waiting
+
+    bucket.acquire()
+    assert sleeps == [pytest.approx(0.4)]  # one token refills every 2/5 s
+
+
+def test_token_bucket_pause_holds_next_acquire(monkeypatch):
+    clock = [0.0]
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(discord_notifier.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(discord_notifier.time, "sleep", fake_sleep)
+    bucket = discord_notifier._TokenBucket(5, 2)
+
+    bucket.pause(3)
+    bucket.acquire()
+    assert sleeps == [pytest.approx(3)]
+
+    bucket.acquire()
+    assert sleeps == [pytest.approx(3)]  # the pause has passed, tokens remain
+
+
+def test_execute_webhook_pauses_limiter_when_bucket_drained(patch_client):
+    client, _ = patch_client([FakeResponse(
+        200, {"id": "m1"}, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "1.5"},
+    )])
+
+    discord_notifier._execute_webhook(*_webhook())
+
+    assert discord_notifier._discord_limiter._blocked_until > discord_notifier.time.monotonic() + 1
+
+
+def test_send_notification_without_webhook_skips_db_work(monkeypatch):
+    monkeypatch.setitem(discord_notifier.CONFIG, "DISCORD_WEBHOOK_URL", "")
+
+    def fail(*a, **k):
+        raise AssertionError("no DB access expected without a webhook")
+
+    monkeypatch.setattr(discord_notifier, "get_offer_by_id", fail)
+    monkeypatch.setattr(discord_notifier, "get_job_skills_from_db", fail)
+
+    assert discord_notifier.send_discord_notification({"id": 1}) is False
+    assert discord_notifier.send_batch_notifications([{"id": 1}]) == []
+
+
+# --- _CircuitBreaker -------------------------------------------------------
+
+def test_circuit_breaker_opens_after_threshold_and_recovers(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(discord_notifier.time, "monotonic", lambda: clock[0])
+    breaker = discord_notifier._CircuitBreaker(3, 30)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow() is True
+
+    breaker.record_failure()
+    assert breaker.allow() is False
+
+    clock[0] += 31
+    assert breaker.allow() is True
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow() is True  # the success reset the failure count
+
+
+def test_server_errors_trip_breaker_and_skip_sends(patch_client, monkeypatch):
+    monkeypatch.setitem(discord_notifier.CONFIG, "DISCORD_WEBHOOK_URL", "http://discord/webhook")
+    offer = _stored_offer(1)
+    client, _ = patch_client([FakeResponse(500), FakeResponse(500)])
+    monkeypatch.setattr(discord_notifier, "_discord_breaker", discord_notifier._CircuitBreaker(2, 30))
+
+    assert discord_notifier.send_discord_notification(offer) is False
+    assert discord_notifier.send_discord_notification(offer) is False
+    # Breaker is open now: no further POST is attempted.
+    assert discord_notifier.send_discord_notification(offer) is False
+    assert len(client.posts) == 2
+
+
+def test_delete_messages_dedupes_and_retries_rate_limits(patch_client, monkeypatch):
+    monkeypatch.setitem(discord_notifier.CONFIG, "DISCORD_WEBHOOK_URL",
+                        "https://discord.com/api/webhooks/123/token")
+    client, _ = patch_client([
+        FakeResponse(429, headers={"Retry-After": "0"}),
+        FakeResponse(204),
+    ])
+
+    assert discord_notifier.delete_discord_messages(["m1", "m1"]) == {"m1"}
+    assert [url for url, _ in client.deletes] == [
+        "https://discord.com/api/webhooks/123/token/messages/m1"] * 2
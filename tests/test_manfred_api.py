@@ -14,11 +14,14 @@ import manfred_api
 # --- Test doubles ----------------------------------------------------------
 
 class FakeResponse:
-    def __init__(self, status_code=200, json_data=None, text="", content=None):
+    def __init__(self, status_code=200, json_data=None, text="", content=None, headers=None):
         self.status_code = status_code
+        self.headers = headers or {}
         self._json = json_data
         self.text = text
-        self.content = content if content is not None else (text.encode() or b"x")
+        if content is None:
+            content = json.dumps(json_data).encode() if json_data is not None else (text.encode() or b"x")
+        self.content = content
 
     def json(self):
         if self._json is None:
@@ -57,9 +60,13 @@ class FakeClient:
 
 @pytest.fixture
 def patch_client(monkeypatch):
-    """Install a FakeClient and capture backoff sleep durations."""
+    """Install a FakeClient and capture backoff sleep durations.
+
+    Jitter is pinned to its upper bound so the backoff ceiling is asserted exactly.
+    """
     sleeps = []
     monkeypatch.setattr(manfred_api.time, "sleep", lambda s: sleeps.append(s))
+    monkeypatch.setattr(manfred_api.random, "uniform", lambda low, high: high)
     monkeypatch.setitem(manfred_api.CONFIG, "MAX_RETRIES", 3)
     monkeypatch.setitem(manfred_api.CONFIG, "RETRY_BACKOFF", 0.5)
 
@@ -71,6 +78,14 @@ def patch_client(monkeypatch):
     return install
 
 
+@pytest.fixture(autouse=True)
+def fresh_module_caches(monkeypatch):
+    """Each test starts with no recent BUILD_ID_HASH refresh and no cached offers list."""
+    monkeypatch.setattr(manfred_api, "_hash_refreshed_at", 0.0)
+    monkeypatch.setattr(manfred_api, "_offers_cache", dict(manfred_api._offers_cache, url=None, raw=None))
+    monkeypatch.setattr(manfred_api, "_page_cache", {"etag": None, "last_modified": None, "hash": None})
+
+
 # --- make_api_request: retry / backoff -------------------------------------
 
 def test_success_on_first_try_does_not_retry(patch_client):
@@ -90,6 +105,45 @@ def test_retries_on_5xx_then_succeeds(patch_client):
     assert sleeps == [1.0, 2.0]
 
 
+def test_backoff_is_jittered_below_capped_ceiling(monkeypatch):
+    monkeypatch.setitem(manfred_api.CONFIG, "RETRY_MAX_SLEEP", 10.0)
+    for retries in range(1, 12):
+        sleep_time = manfred_api._backoff_seconds(0.5, retries)
+        assert 0 <= sleep_time <= min(0.5 * 2 ** retries, 10.0)
+
+
+def test_429_sleeps_for_retry_after_header(patch_client):
+    client, sleeps = patch_client([
+        FakeResponse(429, headers={"Retry-After": "7"}),
+        FakeResponse(429),
+        FakeResponse(200),
+    ])
+    resp = manfred_api.make_api_request("http://test/limited")
+    assert resp.status_code == 200
+    # Header value when present, exponential backoff otherwise.
+    assert sleeps == [7.0, 2.0]
+
+
+def test_retry_after_is_capped_at_retry_max_sleep(patch_client, monkeypatch):
+    monkeypatch.setitem(manfred_api.CONFIG, "RETRY_MAX_SLEEP", 10.0)
+    client, sleeps = patch_client([
+        FakeResponse(429, headers={"Retry-After": "3600"}),
+        FakeResponse(200),
+    ])
+    assert manfred_api.make_api_request("http://test/limited").status_code == 200
+    assert sleeps == [10.0]
+
+
+def test_503_retry_after_only_lengthens_backoff(patch_client):
+    client, sleeps = patch_client([
+        FakeResponse(503, headers={"Retry-After": "5"}),
+        FakeResponse(503, headers={"Retry-After": "0.1"}),
+        FakeResponse(200),
+    ])
+    assert manfred_api.make_api_request("http://test/busy").status_code == 200
+    assert sleeps == [5.0, 2.0]
+
+
 def test_exhausts_retries_on_persistent_5xx_returns_none(patch_client):
     client, sleeps = patch_client([FakeResponse(500)] * 4)
     # MAX_RETRIES defaults to 3 in the fixture -> 4 attempts total.
@@ -125,20 +179,67 @@ def test_post_method_is_used_when_requested(patch_client):
 
 def test_fetch_raw_offers_returns_parsed_json(monkeypatch):
     monkeypatch.setattr(manfred_api, "make_api_request",
-                        lambda url: FakeResponse(json_data=[{"id": 1}]))
+                        lambda url, **kw: FakeResponse(json_data=[{"id": 1}]))
     assert manfred_api.fetch_raw_offers_list() == [{"id": 1}]
 
 
 def test_fetch_raw_offers_returns_none_on_failed_request(monkeypatch):
-    monkeypatch.setattr(manfred_api, "make_api_request", lambda url: None)
+    monkeypatch.setattr(manfred_api, "make_api_request", lambda url, **kw: None)
     assert manfred_api.fetch_raw_offers_list() is None
 
 
 def test_fetch_raw_offers_returns_none_on_bad_json(monkeypatch):
-    monkeypatch.setattr(manfred_api, "make_api_request", lambda url: FakeResponse(json_data=None))
+    monkeypatch.setattr(manfred_api, "make_api_request", lambda url, **kw: FakeResponse(json_data=None))
     assert manfred_api.fetch_raw_offers_list() is None
 
 
+def test_fetch_raw_offers_reused_within_ttl_then_revalidated(monkeypatch):
+    calls = []
+    responses = [
+        FakeResponse(json_data=[{"id": 1}], headers={"ETag": '"v1"'}),
+        FakeResponse(304),
+    ]
+
+    def fake_request(url, headers=None):
+        calls.append(headers)
+        return responses.pop(0)
+
+    monkeypatch.setattr(manfred_api, "make_api_request", fake_request)
+    monkeypatch.setitem(manfred_api.CONFIG, "OFFERS_CACHE_TTL", 60)
+
+    first = manfred_api.fetch_raw_offers_list()
+    first.append({"id": "mutated by a caller"})
+    assert manfred_api.fetch_raw_offers_list() == [{"id": 1}]  # within TTL: no request, fresh list
+    assert calls == [None]
+
+    monkeypatch.setitem(manfred_api.CONFIG, "OFFERS_CACHE_TTL", 0)
+    assert manfred_api.fetch_raw_offers_list() == [{"id": 1}]  # 304 -> cached bytes
+    assert calls[1] == {"If-None-Match": '"v1"'}
+
+
+def test_fetch_raw_offers_bytes_and_list_share_one_request(monkeypatch):
+    calls = []
+    monkeypatch.setattr(manfred_api, "make_api_request",
+                        lambda url, **kw: calls.append(url) or FakeResponse(content=b' [{"id": 1}]'))
+    monkeypatch.setitem(manfred_api.CONFIG, "OFFERS_CACHE_TTL", 60)
+
+    assert manfred_api.fetch_raw_offers_bytes() == b' [{"id": 1}]'
+    assert manfred_api.fetch_raw_offers_list() == [{"id": 1}]
+    assert len(calls) == 1
+
+
+def test_fetch_raw_offers_bytes_rejects_non_json(monkeypatch):
+    monkeypatch.setattr(manfred_api, "make_api_request",
+                        lambda url, **kw: FakeResponse(content=b"<html>maintenance</html>"))
+    assert manfred_api.fetch_raw_offers_bytes() is None
+
+
+def test_make_api_request_treats_304_as_success(patch_client):
+    client, sleeps = patch_client([FakeResponse(304)])
+    assert manfred_api.make_api_request("http://test/cached", headers={"If-None-Match": "x"}).status_code == 304
+    assert sleeps == []
+
+
 # --- fetch_job_details_data ------------------------------------------------
 
 def test_fetch_job_details_missing_slug_returns_none_without_request(monkeypatch):
@@ -169,13 +270,151 @@ def test_fetch_job_details_structure_mismatch_returns_none(monkeypatch):
     monkeypatch.setitem(manfred_api.CONFIG, "BUILD_ID_HASH", "hash123")
     monkeypatch.setattr(manfred_api, "make_api_request",
                         lambda url: FakeResponse(json_data={"pageProps": {}}))
-    # retry_on_hash_error=False to avoid the hash-refresh recursion path.
+    # retry_on_hash_error=False to avoid the hash-refresh retry path.
     assert manfred_api.fetch_job_details_data(7, "dev-role", retry_on_hash_error=False) is None
 
 
+def test_fetch_job_details_retries_once_with_refreshed_hash(monkeypatch):
+    monkeypatch.setitem(manfred_api.CONFIG, "BUILD_ID_HASH", "stale")
+    urls = []
+
+    def fake_request(url):
+        urls.append(url)
+        if "/stale/" in url:
+            return None
+        return FakeResponse(json_data={"pageProps": {"offer": {"id": 7}}})
+
+    def refresh():
+        manfred_api.CONFIG["BUILD_ID_HASH"] = "fresh"
+        return True
+
+    monkeypatch.setattr(manfred_api, "make_api_request", fake_request)
+    monkeypatch.setattr(manfred_api, "fetch_and_update_build_id_hash", refresh)
+
+    assert manfred_api.fetch_job_details_data(7, "dev-role") == {"id": 7}
+    assert len(urls) == 2 and "/fresh/" in urls[1]
+
+
+def test_fetch_job_details_does_not_retry_when_hash_unchanged(monkeypatch):
+    monkeypatch.setitem(manfred_api.CONFIG, "BUILD_ID_HASH", "same")
+    urls = []
+    monkeypatch.setattr(manfred_api, "make_api_request", lambda url: urls.append(url))
+    monkeypatch.setattr(manfred_api, "fetch_and_update_build_id_hash", lambda: True)
+
+    assert manfred_api.fetch_job_details_data(7, "dev-role") is None
+    assert len(urls) == 1
+
+
+def test_fetch_job_details_not_found_payload_triggers_hash_refresh(monkeypatch):
+    monkeypatch.setitem(manfred_api.CONFIG, "BUILD_ID_HASH", "stale")
+    payloads = [{"notFound": True}, {"pageProps": {"offer": {"id": 7}}}]
+    monkeypatch.setattr(manfred_api, "make_api_request",
+                        lambda url: FakeResponse(json_data=payloads.pop(0)))
+    monkeypatch.setattr(manfred_api, "_refreshed_build_id_hash", lambda current, reason: "fresh")
+
+    assert manfred_api.fetch_job_details_data(7, "dev-role") == {"id": 7}
+
+
+def test_fetch_job_details_invalid_payload_returns_none(monkeypatch):
+    monkeypatch.setitem(manfred_api.CONFIG, "BUILD_ID_HASH", "hash123")
+    monkeypatch.setattr(manfred_api, "make_api_request",
+                        lambda url: FakeResponse(json_data=["not", "an", "object"]))
+    assert manfred_api.fetch_job_details_data(7, "dev-role", retry_on_hash_error=False) is None
+
+
+def test_detail_url_format_resolves_pattern_once():
+    pattern = "https://x/_next/data/${BUILD_ID_HASH}/es/job-offers/{offer_id}/{offer_slug}.json"
+    url_format = manfred_api._detail_url_format(pattern)
+    assert url_format.format(build_hash="h1", offer_id=7, offer_slug="dev") == "https://x/_next/data/h1/es/job-offers/7/dev.json"
+    assert manfred_api._detail_url_format(pattern) is url_format
+
+    for bad in ("https://unexpected/pattern", "https://x/${BUILD_ID_HASH}/{unknown}"):
+        fallback = manfred_api._detail_url_format(bad)
+        assert fallback.format(build_hash="h1", offer_id=7, offer_slug="dev").endswith("/_next/data/h1/es/job-offers/7/dev.json")
+
+
+def test_fetch_all_job_details_preserves_order(monkeypatch):
+    monkeypatch.setitem(manfred_api.CONFIG, "BUILD_ID_HASH", "abc")
+    monkeypatch.setattr(manfred_api, "fetch_job_details_data",
+                        lambda offer_id, slug: None if offer_id == 2 else {"id": offer_id, "slug": slug})
+    offers = [{"offer_id": i, "slug": f"s{i}"} for i in (1, 2, 3)]
+
+    assert manfred_api.fetch_all_job_details(offers) == [
+        {"id": 1, "slug": "s1"}, None, {"id": 3, "slug": "s3"},
+    ]
+    assert manfred_api.fetch_all_job_details([]) == []
+
+
 # --- fetch_and_update_build_id_hash (regex extraction) ---------------------
 
+class FakeStreamResponse:
+    def __init__(self, chunks, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._chunks = chunks
+        self.chunks_read = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_text(self, chunk_size=None):
+        for chunk in self._chunks:
+            self.chunks_read += 1
+            yield chunk
+
+
+def test_stream_build_id_stops_once_found_across_chunk_boundary(monkeypatch):
+    stream = FakeStreamResponse(["<html>" + "x" * 100 + '"bui', 'ldId":"ABC', '-12","page"', "never read"])
+    monkeypatch.setattr(manfred_api, "http_client", type("C", (), {"stream": lambda self, m, u, **kw: stream})())
+
+    assert manfred_api._stream_build_id("http://test/page") == "ABC-12"
+    assert stream.chunks_read == 3
+
+
+def test_stream_build_id_returns_none_on_error_status(monkeypatch):
+    stream = FakeStreamResponse(['"buildId":"ABC"'], status_code=503)
+    monkeypatch.setattr(manfred_api, "http_client", type("C", (), {"stream": lambda self, m, u, **kw: stream})())
+
+    assert manfred_api._stream_build_id("http://test/page") is None
+
+
+def test_stream_build_id_revalidates_with_etag(monkeypatch):
+    responses = [FakeStreamResponse(['"buildId":"ABC"'], headers={"ETag": '"p1"'}),
+                 FakeStreamResponse(["never read"], status_code=304)]
+    sent = []
+
+    def stream(self, method, url, headers=None):
+        sent.append(headers)
+        return responses.pop(0)
+
+    monkeypatch.setattr(manfred_api, "http_client", type("C", (), {"stream": stream})())
+    monkeypatch.setitem(manfred_api.CONFIG, "BUILD_ID_HASH", "ABC")
+
+    assert manfred_api._stream_build_id("http://test/page") == "ABC"
+    assert manfred_api._stream_build_id("http://test/page") == "ABC"
+    assert sent == [None, {"If-None-Match": '"p1"'}]
+
+
+def test_build_hash_streamed_without_full_fetch(monkeypatch):
+    monkeypatch.setitem(manfred_api.CONFIG, "BUILD_ID_HASH", "old")
+    monkeypatch.setenv("BUILD_ID_HASH", "old")
+    monkeypatch.setattr(manfred_api, "save_build_hash_to_file", lambda h: True)
+    monkeypatch.setattr(manfred_api, "_stream_build_id", lambda url: "STREAMED")
+
+    def fail(url):
+        raise AssertionError("full fetch not expected when streaming succeeds")
+
+    monkeypatch.setattr(manfred_api, "make_api_request", fail)
+
+    assert manfred_api.fetch_and_update_build_id_hash() is True
+    assert manfred_api.CONFIG["BUILD_ID_HASH"] == "STREAMED"
+
+
 def test_build_hash_extracted_from_html_and_updated(monkeypatch):
+    monkeypatch.setattr(manfred_api, "_stream_build_id", lambda url: None)
     monkeypatch.setitem(manfred_api.CONFIG, "BUILD_ID_HASH", "old")
     monkeypatch.setenv("BUILD_ID_HASH", "old")
     monkeypatch.setattr(manfred_api, "save_build_hash_to_file", lambda h: True)
@@ -186,7 +425,31 @@ def test_build_hash_extracted_from_html_and_updated(monkeypatch):
     assert manfred_api.CONFIG["BUILD_ID_HASH"] == "ABC123"
 
 
+def test_extract_build_id_fast_path_and_regex_fallback():
+    assert manfred_api._extract_build_id('{"buildId":"BIDH-Xy_1","page":"/"}') == "BIDH-Xy_1"
+    # First marker holds an invalid value; the regex finds the valid one later on.
+    assert manfred_api._extract_build_id('"buildId":"bad id" ... "buildId":"GOOD1"') == "GOOD1"
+    assert manfred_api._extract_build_id("<html></html>") is None
+
+
+def test_build_hash_recent_refresh_is_reused(monkeypatch):
+    monkeypatch.setitem(manfred_api.CONFIG, "BUILD_ID_HASH", "old")
+    monkeypatch.setenv("BUILD_ID_HASH", "old")
+    monkeypatch.setattr(manfred_api, "save_build_hash_to_file", lambda h: True)
+    fetches = []
+    monkeypatch.setattr(manfred_api, "_stream_build_id", lambda url: fetches.append(url) or "NEW")
+
+    assert manfred_api.fetch_and_update_build_id_hash() is True
+    assert manfred_api.fetch_and_update_build_id_hash() is True
+    assert len(fetches) == 1
+
+    monkeypatch.setattr(manfred_api, "_hash_refreshed_at", 0.0)  # interval elapsed
+    assert manfred_api.fetch_and_update_build_id_hash() is True
+    assert len(fetches) == 2
+
+
 def test_build_hash_no_match_returns_false_and_keeps_current(monkeypatch):
+    monkeypatch.setattr(manfred_api, "_stream_build_id", lambda url: None)
     monkeypatch.setitem(manfred_api.CONFIG, "BUILD_ID_HASH", "old")
     monkeypatch.setattr(manfred_api, "make_api_request",
                         lambda url: FakeResponse(text="no build id present here"))
@@ -196,5 +459,51 @@ def test_build_hash_no_match_returns_false_and_keeps_current(monkeypatch):
 
 
 def test_build_hash_returns_false_when_page_fetch_fails(monkeypatch):
+    monkeypatch.setattr(manfred_api, "_stream_build_id", lambda url: None)
     monkeypatch.setattr(manfred_api, "make_api_request", lambda url: None)
     assert manfred_api.fetch_and_update_build_id_hash() is False
+
+
+def test_save_build_hash_writes_atomically_and_skips_unchanged(monkeypatch, tmp_path):
+    hash_file = tmp_path / "build_hash.json"
+    monkeypatch.setitem(manfred_api.CONFIG, "CONFIG_FILE_PATH", str(hash_file))
+    monkeypatch.setitem(manfred_api.CONFIG, "BUILD_ID_HASH", "old")
+
+    assert manfred_api.save_build_hash_to_file("H1") is True
+    assert json.loads(hash_file.read_text()) == {"BUILD_ID_HASH": "H1"}
+    assert not (tmp_path / "build_hash.json.tmp").exists()
+    assert manfred_api.CONFIG["BUILD_ID_HASH"] == "H1"
+
+    replaced = []
+    monkeypatch.setattr(manfred_api.os, "replace", lambda *a: replaced.append(a))
+    assert manfred_api.save_build_hash_to_file("H1") is True
+    assert replaced == []  # unchanged hash: no rewrite
+
+
+# --- get_retry_for_request -------------------------------------------------
+
+def test_retry_decorator_retries_transport_errors_then_reraises(patch_client):
+    _, sleeps = patch_client([])
+    calls = []
+
+    @manfred_api.get_retry_for_request
+    def flaky():
+        calls.append(1)
+        raise httpx.ConnectError("down")
+
+    with pytest.raises(httpx.ConnectError):
+        flaky()
+    assert len(calls) == 4  # MAX_RETRIES=3 -> 4 attempts
+    assert sleeps == [1.0, 2.0, 4.0]
+
+
+def test_retry_decorator_does_not_retry_other_errors(patch_client):
+    _, sleeps = patch_client([])
+
+    @manfred_api.get_retry_for_request
+    def broken():
+        raise ValueError("bug")
+
+    with pytest.raises(ValueError):
+        broken()
+    assert sleeps == []
@@ -30,6 +30,59 @@ def test_health_endpoint_ok():
     resp = client.get("/health")
     assert resp.status_code == 200
     assert resp.json()["status"] == "healthy"
+    assert resp.headers["cache-control"] == "max-age=5"
+
+
+def test_raw_offers_passes_upstream_bytes_through(monkeypatch):
+    raw = b'[{"id": 1, "position": "Dev"}]'
+    monkeypatch.setattr(routes.manfred_api, "fetch_raw_offers_bytes", lambda: raw)
+    resp = client.get("/raw-offers")
+    assert resp.status_code == 200
+    assert resp.content == raw
+    assert resp.headers["content-type"] == "application/json"
+
+
+def test_raw_offers_paginates_and_honours_etag(monkeypatch):
+    monkeypatch.setattr(routes.manfred_api, "fetch_raw_offers_list", lambda: [{"id": i} for i in range(5)])
+    resp = client.get("/raw-offers", params={"limit": 2, "offset": 1})
+    assert resp.json() == [{"id": 1}, {"id": 2}]
+
+    again = client.get("/raw-offers", params={"limit": 2, "offset": 1},
+                       headers={"If-None-Match": resp.headers["etag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+
+
+def test_raw_offers_gzip_encoded_when_accepted(monkeypatch):
+    raw = b"[" + b",".join(b'{"id": %d, "position": "Backend Developer"}' % i for i in range(100)) + b"]"
+    monkeypatch.setattr(routes.manfred_api, "fetch_raw_offers_bytes", lambda: raw)
+    resp = client.get("/raw-offers", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.content == raw  # the client transparently decodes
+
+
+def test_raw_offers_upstream_failure_returns_500(monkeypatch):
+    monkeypatch.setattr(routes.manfred_api, "fetch_raw_offers_bytes", lambda: None)
+    assert client.get("/raw-offers").status_code == 500
+
+
+def test_unexpected_error_becomes_generic_500(monkeypatch):
+    def boom(offer_id):
+        raise RuntimeError("db exploded")
+    monkeypatch.setattr(routes.services, "get_job_skills_service", boom)
+
+    resp = client.get("/job-skills/1")
+
+    assert resp.status_code == 500
+    assert resp.json() == {"detail": "An internal server error occurred"}
+
+
+def test_liveness_probe_does_not_touch_the_database(monkeypatch):
+    monkeypatch.setattr(routes.services.database, "check_db_connection",
+                        lambda: (_ for _ in ()).throw(AssertionError("no DB access expected")))
+    resp = client.get("/health/live")
+    assert resp.status_code == 200
+    assert resp.json() == {"status": "ok"}
 
 
 def test_job_skills_unknown_offer_returns_404():
@@ -37,11 +90,58 @@ def test_job_skills_unknown_offer_returns_404():
     assert resp.status_code == 404
 
 
+def test_store_offers_returns_409_while_pipeline_busy():
+    with routes.services._pipeline_lock:
+        assert client.post("/store-offers").status_code == 409
+
+
 def test_send_notifications_without_webhook_returns_400():
     resp = client.post("/send-notifications")
     assert resp.status_code == 400
 
 
+def test_process_job_details_rejects_out_of_range_limit():
+    assert client.post("/process-job-details", json={"limit": 0}).status_code == 422
+    assert client.post("/process-job-details", json={"limit": 1000000}).status_code == 422
+
+
+def test_send_notifications_background_returns_202_and_dispatches(monkeypatch):
+    monkeypatch.setitem(routes.services.CONFIG, "DISCORD_WEBHOOK_URL", "http://webhook")
+    calls = []
+    monkeypatch.setattr(routes.services, "send_pending_notifications_service",
+                        lambda limit: (calls.append(limit), (limit, 0))[1])
+
+    resp = client.post("/send-notifications?background=true", json={"limit": 3})
+
+    assert resp.status_code == 202
+    assert resp.json()["status"] == "accepted"
+    # TestClient runs background tasks before returning.
+    assert calls == [3]
+
+
+def test_send_notifications_returns_409_while_pipeline_busy(monkeypatch):
+    monkeypatch.setitem(routes.services.CONFIG, "DISCORD_WEBHOOK_URL", "http://webhook")
+    with routes.services._pipeline_lock:
+        assert client.post("/send-notifications?background=true").status_code == 409
+        assert client.post("/send-notifications").status_code == 409
+
+
+def test_store_offers_background_returns_202_and_runs(monkeypatch):
+    calls = []
+    monkeypatch.setattr(routes.services, "fetch_and_store_offers_service", lambda: calls.append(1))
+
+    resp = client.post("/store-offers?background=true")
+
+    assert resp.status_code == 202
+    assert resp.json()["status"] == "accepted"
+    assert calls == [1]
+
+
+def test_process_job_details_background_returns_409_while_pipeline_busy():
+    with routes.services._pipeline_lock:
+        assert client.post("/process-job-details?background=true").status_code == 409
+
+
 def test_cleanup_notifications_without_webhook_returns_400():
     resp = client.delete("/cleanup-notifications")
     assert resp.status_code == 400
@@ -3,6 +3,8 @@
 These exercise the real persistence layer (isolated temp DB) and mock only the
 external boundaries: the Manfred HTTP client and the Discord notifier.
 """
+import pytest
+
 import discord_notifier
 import manfred_api
 import relevance
@@ -61,7 +63,7 @@ def test_fetch_and_store_happy_path_stores_processes_and_notifies(monkeypatch):
 
     sent = []
     monkeypatch.setattr(discord_notifier, "send_batch_notifications",
-                        lambda offers, *a, **k: (sent.extend(offers), len(offers))[1])
+                        lambda offers, *a, **k: (sent.extend(offers), [o["id"] for o in offers])[1])
 
     result = services.fetch_and_store_offers_service()
 
@@ -93,6 +95,38 @@ def test_fetch_and_store_skips_notifications_without_webhook(monkeypatch):
     assert result["new_offers"] == 1
 
 
+def test_fetch_and_store_processes_the_new_offers_not_older_pending_ones(monkeypatch):
+    import database
+    database.store_or_update_offers([_offer(1)])  # older offer, details still pending
+    monkeypatch.setattr(manfred_api, "fetch_raw_offers_list", lambda: [_offer(1), _offer(2)])
+    fetched = []
+    monkeypatch.setattr(manfred_api, "fetch_job_details_data",
+                        lambda offer_id, slug: fetched.append(offer_id) or DETAILS_WITH_SKILLS)
+    monkeypatch.setitem(services.CONFIG, "DISCORD_WEBHOOK_URL", "")
+
+    result = services.fetch_and_store_offers_service()
+
+    assert fetched == [2]
+    assert result["skills_processed"] == 1
+
+
+def test_fetch_and_store_does_not_fetch_details_with_made_up_slug(monkeypatch):
+    no_slug = _offer(1)
+    no_slug.pop("slug", None)
+    monkeypatch.setattr(manfred_api, "fetch_raw_offers_list", lambda: [no_slug])
+    requested = []
+    real_fetch = manfred_api.fetch_job_details_data
+    monkeypatch.setattr(manfred_api, "fetch_job_details_data",
+                        lambda offer_id, slug: requested.append(slug) or real_fetch(offer_id, slug))
+    monkeypatch.setitem(services.CONFIG, "DISCORD_WEBHOOK_URL", "")
+
+    result = services.fetch_and_store_offers_service()
+
+    # The stored (missing) slug is passed through and the fetch is skipped.
+    assert requested == [None]
+    assert result["skills_processed"] == 0
+
+
 # --- process_pending_details_service ---------------------------------------
 
 def test_process_pending_details_stores_skills_and_languages(monkeypatch):
@@ -126,7 +160,7 @@ def test_send_pending_notifications_sends_and_marks(monkeypatch):
     database.store_or_update_offers([_offer(1), _offer(2)])
     monkeypatch.setitem(services.CONFIG, "DISCORD_WEBHOOK_URL", "http://webhook")
     monkeypatch.setattr(discord_notifier, "send_batch_notifications",
-                        lambda offers, *a, **k: len(offers))
+                        lambda offers, *a, **k: [o["id"] for o in offers])
 
     sent, remaining = services.send_pending_notifications_service(limit=5)
 
@@ -135,6 +169,38 @@ def test_send_pending_notifications_sends_and_marks(monkeypatch):
     assert database.get_pending_notification_offers() == []
 
 
+def test_send_pending_notifications_reports_true_remaining(monkeypatch):
+    import database
+    database.store_or_update_offers([_offer(i) for i in range(1, 6)])
+    monkeypatch.setitem(services.CONFIG, "DISCORD_WEBHOOK_URL", "http://webhook")
+    monkeypatch.setattr(discord_notifier, "send_batch_notifications",
+                        lambda offers, batch_size=5: [o["id"] for o in offers[:batch_size]])
+
+    # Only 2 rows are read (limit * 2), but all 5 are counted as pending.
+    sent, remaining = services.send_pending_notifications_service(limit=1)
+
+    assert (sent, remaining) == (1, 4)
+
+
+def test_send_pending_notifications_marks_only_delivered_offers(monkeypatch):
+    import database
+    database.store_or_update_offers([_offer(1), _offer(2), _offer(3)])
+    monkeypatch.setitem(services.CONFIG, "DISCORD_WEBHOOK_URL", "http://webhook")
+    failed = []
+
+    def send(offers, *a, **k):
+        # The message for the first offer fails; the later ones get through.
+        failed.append(offers[0]["id"])
+        return [o["id"] for o in offers[1:]]
+
+    monkeypatch.setattr(discord_notifier, "send_batch_notifications", send)
+
+    sent, _ = services.send_pending_notifications_service(limit=5)
+
+    assert sent == 2
+    assert [o["offer_id"] for o in database.get_pending_notification_offers()] == failed
+
+
 def test_send_pending_notifications_none_when_empty(monkeypatch):
     monkeypatch.setitem(services.CONFIG, "DISCORD_WEBHOOK_URL", "http://webhook")
     assert services.send_pending_notifications_service(limit=5) == (0, 0)
@@ -157,8 +223,46 @@ def test_get_job_skills_service_returns_skills_and_languages():
     assert result["languages"] == [{"name": "Spanish", "level": "C2"}]
 
 
+def test_get_job_skills_service_caches_retrieved_offers_only(monkeypatch):
+    import database
+    database.store_or_update_offers([_offer(1), _offer(2)])
+    database.store_job_skills(1, {"must": [{"skill": "Go", "level": 1}], "nice": [], "extra": []})
+    calls = []
+    real = database.get_offer_skills_and_languages
+    monkeypatch.setattr(database, "get_offer_skills_and_languages",
+                        lambda offer_id: calls.append(offer_id) or real(offer_id))
+
+    for offer_id in (1, 1, 2, 2):
+        services.get_job_skills_service(offer_id)
+
+    # Offer 1 is served from the cache; offer 2 has no skills yet and is re-read.
+    assert calls == [1, 2, 2]
+
+
+def test_get_job_skills_service_returns_copies_of_cached_results():
+    import database
+    database.store_or_update_offers([_offer(1)])
+    database.store_job_skills(1, {"must": [{"skill": "Go", "level": 1}], "nice": [], "extra": []})
+
+    first = services.get_job_skills_service(1)
+    first["skills"]["must"].clear()
+    second = services.get_job_skills_service(1)
+    second["skills"]["must"][0]["skill"] = "Rust"
+
+    assert services.get_job_skills_service(1)["skills"]["must"][0]["skill"] == "Go"
+
+
 # --- get_health_status_service ---------------------------------------------
 
+def test_health_status_reuses_recent_db_check(monkeypatch):
+    calls = []
+    monkeypatch.setattr(services.database, "check_db_connection",
+                        lambda: calls.append(1) or (True, "connected"))
+    services.get_health_status_service()
+    services.get_health_status_service()
+    assert len(calls) == 1
+
+
 def test_health_status_reports_healthy_when_db_connected():
     status_data, is_healthy = services.get_health_status_service()
     assert is_healthy is True
@@ -166,6 +270,15 @@ def test_health_status_reports_healthy_when_db_connected():
     assert status_data["database_status"] == "connected"
 
 
+def test_pipeline_services_fail_fast_while_one_is_running():
+    with services._pipeline_lock:
+        with pytest.raises(services.ServiceBusyError):
+            services.process_pending_details_service(limit=10)
+        with pytest.raises(services.ServiceBusyError):
+            services.fetch_and_store_offers_service()
+    assert services.process_pending_details_service(limit=10) == 0
+
+
 # --- cleanup_obsolete_job_notifications_service ----------------------------
 
 def test_cleanup_without_webhook_returns_zero(monkeypatch):
@@ -206,7 +319,7 @@ def _enable_filter(monkeypatch, behavior="hard"):
 def _capture_sent(monkeypatch):
     sent = []
     monkeypatch.setattr(discord_notifier, "send_batch_notifications",
-                        lambda offers, *a, **k: (sent.extend(offers), len(offers))[1])
+                        lambda offers, *a, **k: (sent.extend(offers), [o["id"] for o in offers])[1])
     return sent
 
 
@@ -258,3 +371,12 @@ def test_send_pending_respects_hard_filter(monkeypatch):
 
     assert {o["id"] for o in sent} == {1}
     assert offers_sent == 1
+
+
+def test_extract_skills_section_prefers_primary_path():
+    primary = {"skills": {"must": []}}
+    fallback = {"must": []}
+
+    assert services._extract_skills_section({"skillsSectionData": primary, "content": {"skills": fallback}}) is primary
+    assert services._extract_skills_section({"skillsSectionData": "junk", "content": {"skills": fallback}}) is fallback
+    assert services._extract_skills_section({"content": "junk"}) is None